@@ -0,0 +1,398 @@
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import struct
+import zipfile
+import argparse
+import platform
+import tempfile
+import subprocess
+import math
+import importlib.util
+from datetime import datetime
+
+# 生成器脚本文件名带连字符，无法直接 import，这里按路径加载
+GENERATOR_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PPT-Hybird-V1.1-Pro.py")
+
+
+def load_generator_module(script_path=GENERATOR_SCRIPT):
+    spec = importlib.util.spec_from_file_location("ppt_hybird", script_path)
+    module = importlib.util.module_from_spec(spec)
+    # 注册到 sys.modules，并行模式的工作函数才能被 pickle
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_substitute(text, replacements):
+    """旧版 _replace_text_in_shape 的替换路径：每个段落逐个占位符排序并执行 re.sub"""
+    if not any(f"[{k}]" in text for k in replacements):
+        return text
+    new_text = text
+    sorted_keys = sorted(replacements.keys(), key=len, reverse=True)
+    for placeholder in sorted_keys:
+        value = replacements[placeholder]
+        if value == "nan" or value is None:
+            value = ""
+        pattern = r'\[' + re.escape(placeholder) + r'\]'
+        new_text = re.sub(pattern, str(value), new_text)
+    return new_text
+
+
+def make_substitution_case(n_columns, records_per_page, n_paragraphs):
+    """合成一组列名、替换字典和段落文本 (约一半段落不含占位符)"""
+    columns = [f"字段{c}" for c in range(n_columns)]
+    replacements = {}
+    placeholders = set()
+    for offset in range(records_per_page):
+        suffix = f"_{offset + 1}" if offset > 0 else ""
+        for col in columns:
+            replacements[f"{col}{suffix}"] = f"值{col}{suffix}"
+    used = [f"{columns[c % n_columns]}{'' if p == 0 else f'_{p + 1}'}"
+            for p in range(records_per_page) for c in range(min(3, n_columns))]
+    placeholders.update(used)
+    paragraphs = []
+    for i in range(n_paragraphs):
+        if i % 2:
+            paragraphs.append(f"装饰文字 {i}")
+        else:
+            key = used[i % len(used)]
+            paragraphs.append(f"兹授予 [{key}] 同学在比赛中荣获 [{used[(i + 1) % len(used)]}]")
+    return placeholders, replacements, paragraphs
+
+
+def bench_substitution(module, n_columns=20, records_per_page=4, n_paragraphs=40, pages=100):
+    placeholders, replacements, paragraphs = make_substitution_case(n_columns, records_per_page, n_paragraphs)
+
+    generator = module.PPTGenerator.__new__(module.PPTGenerator)
+    generator.placeholders = placeholders
+    generator._compile_placeholder_regex()
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        legacy = [legacy_substitute(text, replacements) for text in paragraphs]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    regex = generator.placeholder_regex
+    for _ in range(pages):
+        compiled = [generator._substitute_text(text, replacements) if regex.search(text) else text
+                    for text in paragraphs]
+    compiled_time = time.perf_counter() - start
+
+    if legacy != compiled:
+        raise AssertionError("编译替换引擎与旧版替换结果不一致")
+
+    return {
+        "columns": n_columns,
+        "records_per_page": records_per_page,
+        "paragraphs": n_paragraphs,
+        "pages": pages,
+        "legacy_seconds": round(legacy_time, 4),
+        "compiled_seconds": round(compiled_time, 4),
+        "speedup": round(legacy_time / compiled_time, 1) if compiled_time else None,
+    }
+
+
+# ==========================================
+# 端到端生成基准：合成模板与数据集，每个用例在独立子进程中运行 (峰值内存互不干扰)
+# ==========================================
+TEMPLATE_PROFILES = {
+    # 少量形状、少量占位符
+    "simple": {"decorations": 2, "fields": 3, "image": False, "table": False},
+    # 大量装饰形状、较多占位符，带图片和表格
+    "rich": {"decorations": 40, "fields": 12, "image": True, "table": True},
+}
+
+DATASET_PROFILES = {
+    "narrow": 5,
+    "wide": 60,
+}
+
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def make_png(width=64, height=64):
+    """生成一张纯色 PNG (不依赖图像库)"""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + b"\xff\x85\xb3" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def field_names(n_columns):
+    return [f"字段{c}" for c in range(n_columns)]
+
+
+def make_template(path, profile, n_fields, records_per_page):
+    """按模板配置合成 N 个/页的模板：第 k 个位置的占位符为 [字段c_k]"""
+    from pptx import Presentation
+    from pptx.util import Emu, Pt
+
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    width, height = prs.slide_width, prs.slide_height
+
+    for i in range(profile["decorations"]):
+        box = slide.shapes.add_textbox(Emu(width * (i % 8) // 8), Emu(height * (i // 8) // 8),
+                                       Emu(width // 8), Emu(height // 16))
+        box.text_frame.text = f"装饰 {i}"
+
+    if profile["image"]:
+        image_path = os.path.join(os.path.dirname(path), "bench_logo.png")
+        with open(image_path, "wb") as f:
+            f.write(make_png())
+        slide.shapes.add_picture(image_path, 0, 0, Emu(width // 10), Emu(width // 10))
+
+    names = field_names(n_fields)
+    cols = math.ceil(math.sqrt(records_per_page))
+    rows = math.ceil(records_per_page / cols)
+    cell_w, cell_h = width // cols, height // rows
+    for k in range(records_per_page):
+        suffix = f"_{k + 1}" if k else ""
+        left, top = cell_w * (k % cols), cell_h * (k // cols)
+        box = slide.shapes.add_textbox(Emu(left), Emu(top), Emu(cell_w), Emu(cell_h))
+        frame = box.text_frame
+        frame.text = f"兹授予 [{names[0]}{suffix}] 同学"
+        for name in names[1:]:
+            paragraph = frame.add_paragraph()
+            paragraph.text = f"{name}: [{name}{suffix}]"
+            paragraph.runs[0].font.size = Pt(8)
+
+    if profile["table"]:
+        shape = slide.shapes.add_table(2, 2, Emu(width // 2), Emu(height - height // 8),
+                                       Emu(width // 2), Emu(height // 8))
+        shape.table.cell(0, 0).text = "编号"
+        shape.table.cell(1, 0).text = f"[{names[0]}]"
+
+    prs.save(path)
+
+
+def make_dataset(path, rows, n_columns):
+    """合成确定性的数据集 (xlsx 或 csv，按扩展名决定)"""
+    import pandas as pd
+
+    names = field_names(n_columns)
+    frame = pd.DataFrame({name: [f"值{r}_{c}" for r in range(rows)] for c, name in enumerate(names)})
+    if path.endswith(".csv"):
+        frame.to_csv(path, index=False, encoding="utf-8-sig")
+    else:
+        frame.to_excel(path, index=False)
+
+
+def prepare_case_inputs(workdir, template, width, rows, records_per_page, data_format):
+    """合成 (或复用已合成的) 模板与数据文件"""
+    profile = TEMPLATE_PROFILES[template]
+    n_columns = DATASET_PROFILES[width]
+    n_fields = min(profile["fields"], n_columns)
+
+    template_path = os.path.join(workdir, f"tpl_{template}_{n_fields}f_{records_per_page}up.pptx")
+    if not os.path.exists(template_path):
+        make_template(template_path, profile, n_fields, records_per_page)
+
+    data_path = os.path.join(workdir, f"data_{width}_{rows}.{data_format}")
+    if not os.path.exists(data_path):
+        make_dataset(data_path, rows, n_columns)
+    return template_path, data_path
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except (ImportError, AttributeError):
+        return None
+
+
+def count_slides(path):
+    with zipfile.ZipFile(path) as zf:
+        return sum(1 for name in zf.namelist() if re.fullmatch(r"ppt/slides/slide\d+\.xml", name))
+
+
+def run_case(case):
+    """在当前进程内运行一个用例 (由子进程调用)，返回结果字典"""
+    module = load_generator_module(case["script"])
+    output_path = case["output"]
+    n = case["records_per_page"]
+
+    start = time.perf_counter()
+    generator = module.PPTGenerator(case["template_path"], case["data_path"], output_path)
+    load = time.perf_counter() - start
+    if hasattr(generator, "run_general_mode"):
+        kwargs = {}
+        if case["workers"] > 1:
+            kwargs["workers"] = case["workers"]
+        if case["streaming"]:
+            kwargs["streaming"] = True
+        generator.run_general_mode(n, **kwargs)
+    elif n == 1:
+        # V1.0 只有单页 / 双页两种模式
+        generator.run_single_mode()
+    elif n == 2:
+        generator.run_double_mode()
+    else:
+        raise NotImplementedError(f"该版本不支持每页 {n} 个")
+    wall = time.perf_counter() - start
+
+    slides = count_slides(output_path)
+    return {
+        "wall_seconds": round(wall, 3),
+        "load_seconds": round(load, 3),
+        "slides": slides,
+        "slides_per_sec": round(slides / wall, 1) if wall else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "output_bytes": os.path.getsize(output_path),
+    }
+
+
+def run_case_subprocess(case, timeout=None):
+    command = [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case, ensure_ascii=False)]
+    proc = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace",
+                          timeout=timeout)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    tail = (proc.stderr.strip().splitlines() or ["无输出"])[-1]
+    return {"error": tail}
+
+
+def case_key(result):
+    return (result["template"], result["width"], result["rows"], result["records_per_page"])
+
+
+def bench_generation(args):
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "ppt-benchmark")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+
+    for template in args.templates:
+        for width in args.widths:
+            for rows in args.rows:
+                for n in args.per_page:
+                    template_path, data_path = prepare_case_inputs(workdir, template, width, rows, n, args.format)
+                    case = {
+                        "script": os.path.abspath(args.script),
+                        "template": template,
+                        "width": width,
+                        "rows": rows,
+                        "records_per_page": n,
+                        "workers": args.workers,
+                        "streaming": args.streaming,
+                        "template_path": template_path,
+                        "data_path": data_path,
+                        "output": os.path.join(workdir, "out.pptx"),
+                    }
+                    result = dict(case, **run_case_subprocess(case, args.timeout))
+                    for key in ("script", "template_path", "data_path", "output"):
+                        result.pop(key)
+                    results.append(result)
+
+                    label = f"{template:<6} {width:<6} 行数={rows:>7} 每页={n:>2}"
+                    if "error" in result:
+                        print(f"{label}  失败: {result['error']}")
+                    else:
+                        print(f"{label}  {result['wall_seconds']:>8.2f}s  {result['slides_per_sec']:>8.1f} 页/秒  "
+                              f"峰值内存 {result['peak_rss_mb']} MB  输出 {result['output_bytes'] / 1024:.0f} KB")
+
+    report = {
+        "script": os.path.basename(args.script),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "workers": args.workers,
+        "streaming": args.streaming,
+        "format": args.format,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.json}")
+    return report
+
+
+def compare_reports(old_path, new_path):
+    """按用例对比两份结果 (如 V1.0 与 V1.1-Pro)，打印耗时与内存变化"""
+    with open(old_path, encoding="utf-8") as f:
+        old = {case_key(r): r for r in json.load(f)["results"] if "error" not in r}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"--- {os.path.basename(old_path)} -> {os.path.basename(new_path)} ({new['script']}) ---")
+    for result in new["results"]:
+        before = old.get(case_key(result))
+        if before is None or "error" in result:
+            continue
+        speedup = before["wall_seconds"] / result["wall_seconds"] if result["wall_seconds"] else float("inf")
+        rss = ""
+        if before["peak_rss_mb"] and result["peak_rss_mb"]:
+            rss = f"  内存 {before['peak_rss_mb']} -> {result['peak_rss_mb']} MB"
+        print(f"{result['template']:<6} {result['width']:<6} 行数={result['rows']:>7} 每页={result['records_per_page']:>2}  "
+              f"{before['wall_seconds']:.2f}s -> {result['wall_seconds']:.2f}s  ({speedup:.2f}x){rss}")
+
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PPT 批量生成性能基准")
+    parser.add_argument("--script", default=GENERATOR_SCRIPT, help="被测生成器脚本路径 (可指向 V1.0)")
+    parser.add_argument("--micro", action="store_true", help="只运行占位符替换引擎的微基准")
+    parser.add_argument("--pages", type=int, default=100, help="微基准每组用例模拟的页数")
+    parser.add_argument("--templates", type=lambda v: parse_list(v), default=list(TEMPLATE_PROFILES),
+                        help="模板配置，逗号分隔 (simple,rich)")
+    parser.add_argument("--widths", type=lambda v: parse_list(v), default=list(DATASET_PROFILES),
+                        help="数据宽度，逗号分隔 (narrow,wide)")
+    parser.add_argument("--rows", type=lambda v: parse_list(v, int), default=[1000],
+                        help="数据行数，逗号分隔 (如 1000,10000,200000)")
+    parser.add_argument("--per-page", type=lambda v: parse_list(v, int), default=[1, 2, 4, 16],
+                        help="每页数量，逗号分隔")
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx", help="合成数据格式 (V1.0 只支持 xlsx)")
+    parser.add_argument("--workers", type=int, default=1, help="并行渲染进程数")
+    parser.add_argument("--streaming", action="store_true", help="使用流式输出")
+    parser.add_argument("--timeout", type=float, default=None, help="单个用例的超时秒数")
+    parser.add_argument("--workdir", help="合成文件的缓存目录 (默认在系统临时目录)")
+    parser.add_argument("--json", help="结果 JSON 输出路径")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两份结果 JSON")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(RESULT_PREFIX + json.dumps(run_case(json.loads(args.run_case)), ensure_ascii=False))
+        return 0
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return 0
+
+    if args.micro:
+        module = load_generator_module(args.script)
+        print("--- 占位符替换引擎基准 (旧版逐个 re.sub vs 编译单次扫描) ---")
+        for n_columns, records_per_page in [(5, 1), (20, 2), (20, 4)]:
+            result = bench_substitution(module, n_columns, records_per_page, pages=args.pages)
+            print(f"列数={result['columns']:>3}  每页={result['records_per_page']:>2}  "
+                  f"旧版 {result['legacy_seconds']:.3f}s  编译 {result['compiled_seconds']:.3f}s  "
+                  f"加速 {result['speedup']}x")
+        return 0
+
+    print(f"--- 端到端生成基准: {os.path.basename(args.script)} ---")
+    bench_generation(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,56 @@
 import os
+import io
+import posixpath
+import zipfile
 import pandas as pd
 from pptx import Presentation
+from pptx.text.text import _Paragraph
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn, nsuri
+from pptx.oxml.slide import CT_Slide
+from pptx.opc.constants import CONTENT_TYPE as CT, NAMESPACE as NS, RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.package import Part, XmlPart
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI, PackURI
+try:
+    # python-pptx 的内部类，仅 save_package 用来生成 [Content_Types].xml；新版本没有时退回 Package.save
+    from pptx.opc.serialized import _ContentTypesItem
+except ImportError:
+    _ContentTypesItem = None
+from pptx.parts.image import ImagePart
+from pptx.parts.slide import SlidePart
+from lxml import etree
 import re
 from datetime import datetime
 import warnings
 import traceback
 import copy
-import tkinter as tk
-from tkinter import filedialog, messagebox
-from tkinter import ttk
+import argparse
+import json
+# tkinter 只在打开图形界面时于 main() 中导入：命令行模式不需要，服务器上的 Python 也可能没有
+tk = filedialog = messagebox = ttk = None
 import webbrowser
 import urllib.parse
 import ctypes
 import math
+import sys
+import time
+import importlib.util
+import csv
+import hashlib
+import sqlite3
+import zlib
+import queue
+import threading
+import shutil
+import signal
+import subprocess
+import tempfile
+import pathlib
+import multiprocessing
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 warnings.filterwarnings('ignore')
 
@@ -22,29 +60,108 @@ try:
 except Exception:
     pass
 
+# 一次 XPath 取出全部段落 / 文本节点，覆盖表格单元格 (graphicFrame) 和组合形状 (grpSp) 内部
+_XPATH_PARAGRAPHS = etree.XPath('.//a:p', namespaces={'a': nsuri('a')})
+_XPATH_TEXT_NODES = etree.XPath('.//a:t', namespaces={'a': nsuri('a')})
+
+# 图片占位符：替换文字 (或形状名称) 为 [列名] 的图片，按该列给出的图片路径逐条替换
+IMAGE_PLACEHOLDER_PATTERN = re.compile(r'\s*\[([^\[\]]+)\]\s*')
+
+# 按记录出文件时的文件名模板，如 "[姓名]_[学号].pptx"
+FILE_NAME_FIELD_PATTERN = re.compile(r'\[([^\[\]]+)\]')
+
+# 模板幻灯片引用的部件中，所有输出幻灯片共用一份的类型；其余 (图表、SmartArt、嵌入对象等) 每张幻灯片复制一份
+SHARED_PART_RELTYPES = (RT.IMAGE, RT.MEDIA, RT.VIDEO, RT.AUDIO)
+
+# 幻灯片、版式、母版等文档结构部件不能随对象一起复制 (如跳转到其他幻灯片的超链接)
+STRUCTURE_CONTENT_TYPES = {CT.PML_SLIDE, CT.PML_SLIDE_LAYOUT, CT.PML_SLIDE_MASTER, CT.PML_NOTES_SLIDE,
+                           CT.PML_NOTES_MASTER, CT.PML_HANDOUT_MASTER, CT.PML_PRESENTATION_MAIN}
+
+# 引用无法复制时只去掉链接本身、保留形状的超链接元素
+HYPERLINK_TAGS = (qn('a:hlinkClick'), qn('a:hlinkHover'))
+
+# SmartArt 数据部件经 dsp:dataModelExt 的 relId 引用幻灯片上的绘图 (diagramDrawing) 关系
+DIAGRAM_DRAWING_REL_PATTERN = re.compile(rb'\brelId="([^"]+)"')
+
+
+class GenerationCancelled(Exception):
+    # 用户在生成过程中点击了取消
+    pass
+
 
 class PPTGenerator:
     # ==========================================
-    # 核心逻辑类 (完全保持不变)
+    # 核心逻辑类：解析模板占位符、读取数据、渲染并写出幻灯片
     # ==========================================
-    def __init__(self, template_path, excel_path, output_path, log_callback=None):
+    def __init__(self, template_path, excel_path, output_path, log_callback=None, stream_data=False,
+                 cancel_event=None, progress_callback=None, verbose=False, log_prefix="", file_name_pattern=None):
         self.template_path = template_path
         self.excel_path = excel_path
         self.output_path = output_path
         self.log_callback = log_callback
+        # 进度事件回调 (见 ProgressReporter)；未提供时按节流间隔输出一行进度日志
+        self.progress_callback = progress_callback
+        # 逐页输出 "正在处理页面" 日志 (大批量时日志本身会明显拖慢生成)
+        self.verbose = verbose
+        # 多个任务同时运行时用于区分日志来源，如 "[任务名] "
+        self.log_prefix = log_prefix
+        self.stream_data = stream_data
+        # threading.Event，置位后在两页之间停止生成
+        self.cancel_event = cancel_event
+        # 按记录出文件时的文件名模板；其中引用的列即使模板没用到也要读取
+        self.file_name_pattern = file_name_pattern
+        self.file_name_columns = set(FILE_NAME_FIELD_PATTERN.findall(file_name_pattern or ""))
+        self._record_skeletons = {}
+        # 导出 PDF 时转换成功的文件
+        self.pdf_files = []
         self.template_pptx = None
         self.excel_data = None
+        self.data_source = None
+        self.estimated_rows = None
+        self.columns = []
+        self.records = []
         self.placeholders = set()
-
-        self._load_template()
-        self._load_excel_data()
-        self._extract_placeholders()
+        self.placeholder_regex = None
+        # 每张模板幻灯片各有一份渲染计划和序列化形状，每页数据依次渲染全部模板幻灯片
+        self.render_plans = []
+        self.template_shapes_xml = []
+        # 图片占位符：列名集合，以及每张模板幻灯片的 [(关系ID, 占位符名, (宽, 高) EMU)]
+        self.image_keys = set()
+        self.image_plans = []
+        # 模板形状引用的图片/媒体/超链接关系，以及幻灯片背景；输出幻灯片共用同一份部件
+        self.template_relationships = []
+        self.template_backgrounds_xml = []
+        self.image_store = ImageStore()
+        self._image_paths = {}
+        # 各阶段耗时与计数，运行结束后可导出为 JSON
+        self.stats = GenerationStats()
+
+        with self.stats.phase("template_load"):
+            self._load_template()
+        with self.stats.phase("placeholder_extract"):
+            self._extract_placeholders()
+            self._compile_placeholder_regex()
+            self._serialize_template_shapes()
+            self._build_render_plan()
+        if self.excel_path is not None:
+            # 并行工作进程只需要模板，不读取数据
+            with self.stats.phase("data_load"):
+                self._load_excel_data()
+                self._prepare_records()
 
     def log(self, message):
+        message = self.log_prefix + str(message)
         print(message)
         if self.log_callback:
             self.log_callback(message)
 
+    def _log_progress(self, event):
+        self.log(format_progress(event))
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise GenerationCancelled("生成已被用户取消")
+
     def _load_template(self):
         if not os.path.exists(self.template_path):
             raise FileNotFoundError(f"模板文件不存在: {self.template_path}")
@@ -53,136 +170,2120 @@ class PPTGenerator:
 
     def _load_excel_data(self):
         if not os.path.exists(self.excel_path):
-            raise FileNotFoundError(f"Excel文件不存在: {self.excel_path}")
-        try:
-            self.excel_data = pd.read_excel(self.excel_path, engine='openpyxl')
-        except:
-            self.excel_data = pd.read_excel(self.excel_path, engine='xlrd')
-
-        self.excel_data.columns = self.excel_data.columns.str.strip()
-        self.excel_data = self.excel_data.astype(str).apply(lambda x: x.str.strip())
-        self.log(f"成功加载Excel数据，共 {len(self.excel_data)} 行")
+            raise FileNotFoundError(f"数据文件不存在: {self.excel_path}")
+        # 按扩展名选择数据源：Excel / CSV / Parquet / JSON Lines
+        self.data_source = open_data_source(self.excel_path, stream=self.stream_data)
+        # 占位符集合下推到读取阶段，模板没用到的列不解析、不转换
+        self.data_source.open(column_filter=self._is_column_used)
+        self.excel_data = self.data_source.frame
+        self.estimated_rows = self.data_source.estimated_rows
+
+        total_columns = self.data_source.total_columns
+        if total_columns is not None:
+            skipped = total_columns - len(self.data_source.columns)
+            self.log(f"列裁剪: 共 {total_columns} 列，读取模板用到的 {len(self.data_source.columns)} 列，跳过 {skipped} 列")
+
+        if self.excel_data is None:
+            # 流式读取：只解析表头，数据行在生成过程中由后台线程逐行读入
+            self.log(f"已启用流式读取{self.data_source.kind}数据，"
+                     f"预计 {self.estimated_rows if self.estimated_rows is not None else '?'} 行")
+        else:
+            self.log(f"成功加载{self.data_source.kind}数据，共 {len(self.excel_data)} 行")
+
+    def _is_column_used(self, column):
+        # 占位符可直接是列名，也可以是 N 图/页模式下的 列名_2、列名_3 ...
+        if column in self.file_name_columns:
+            return True
+        for placeholder in self.placeholders:
+            if placeholder == column:
+                return True
+            base, sep, suffix = placeholder.rpartition('_')
+            if sep and base == column and suffix.isdigit():
+                return True
+        return False
+
+    def _prepare_records(self):
+        # 数据源只保留了模板用到的列，渲染循环只需按下标读取普通元组
+        self.columns = list(self.data_source.columns)
+        self.records = self.data_source.load_records()
 
     def _extract_placeholders(self):
         if len(self.template_pptx.slides) == 0:
             return
-        slide = self.template_pptx.slides[0]
-        pattern = r'\[([^\]]+)\]'
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                text = shape.text
+        pattern = r'\[([^\[\]]+)\]'
+        for slide in self.template_pptx.slides:
+            # 逐段落拼接全部 a:t，表格和组合形状里的占位符同样能找到
+            for p in _XPATH_PARAGRAPHS(slide.shapes._spTree):
+                text = "".join(t.text or "" for t in p.iter(qn('a:t')))
                 matches = re.findall(pattern, text)
                 for match in matches:
                     self.placeholders.add(match.strip())
+            for pic in slide.shapes._spTree.iter(qn('p:pic')):
+                key = self._image_placeholder_key(pic)
+                if key is not None:
+                    self.image_keys.add(key)
+        self.placeholders.update(self.image_keys)
         self.log(f"检测到模板占位符: {list(self.placeholders)}")
+        if self.image_keys:
+            self.log(f"检测到图片占位符: {sorted(self.image_keys)}")
+        if len(self.template_pptx.slides) > 1:
+            self.log(f"模板共 {len(self.template_pptx.slides)} 张幻灯片，每页数据将依次生成全部幻灯片")
+
+    def _image_placeholder_key(self, pic):
+        c_nv_pr = pic.find(qn('p:nvPicPr')).find(qn('p:cNvPr'))
+        for label in (c_nv_pr.get('descr'), c_nv_pr.get('name')):
+            match = IMAGE_PLACEHOLDER_PATTERN.fullmatch(label or "")
+            if match:
+                return match.group(1).strip()
+        return None
+
+    def _compile_placeholder_regex(self):
+        # 每个任务只编译一次：所有占位符合并为一个交替模式，长的优先
+        if not self.placeholders:
+            self.placeholder_regex = None
+            return
+        keys = sorted(self.placeholders, key=len, reverse=True)
+        self.placeholder_regex = re.compile(r'\[(' + '|'.join(re.escape(k) for k in keys) + r')\]')
+
+    def _build_render_plan(self):
+        # 模板只分析一次：在序列化好的形状上建立文本节点索引，记录每个含占位符的段落中
+        # 各 a:t 节点替换后的组成。计划项: ((a:t 全局序号, 片段), ...) —— 片段偶数位是静态文本，奇数位是占位符名
+        # 渲染时对克隆执行同一个 XPath 即得到一一对应的节点列表。每张模板幻灯片一份计划
+        # (图表的文字在独立的 chart 部件中，不在幻灯片 XML 里，不参与替换)
+        self.render_plans = []
+        for shapes_xml in self.template_shapes_xml:
+            render_plan = []
+            self.render_plans.append(render_plan)
+            if self.placeholder_regex is None:
+                continue
+            container = parse_xml(shapes_xml)
+            node_index = {t: i for i, t in enumerate(_XPATH_TEXT_NODES(container))}
+            for p in _XPATH_PARAGRAPHS(container):
+                node_plan = self._plan_paragraph_runs(p)
+                if node_plan:
+                    t_nodes = list(p.iter(qn('a:t')))
+                    render_plan.append(tuple((node_index[t_nodes[t_index]], parts) for t_index, parts in node_plan))
+        self.log(f"渲染计划: {sum(len(plan) for plan in self.render_plans)} 个段落含占位符")
+
+    def _plan_paragraph_runs(self, p):
+        # 在段落全部 a:t 拼接出的文本上匹配占位符，占位符可以跨越多个 run (如 "[姓" + "名]")：
+        # 替换值写入占位符起始所在的节点，其余节点中属于该占位符的字符被删掉，
+        # 不含占位符的节点不进入计划，格式与结构保持原样
+        texts = [t.text or "" for t in p.iter(qn('a:t'))]
+        matches = list(self.placeholder_regex.finditer("".join(texts)))
+        if not matches:
+            return None
+
+        node_plan = []
+        node_start = 0
+        for t_index, text in enumerate(texts):
+            node_end = node_start + len(text)
+            parts = [""]
+            cursor = node_start
+            for match in matches:
+                if match.end() <= node_start or match.start() >= node_end:
+                    continue
+                if match.start() > cursor:
+                    parts[-1] += text[cursor - node_start:match.start() - node_start]
+                if match.start() >= node_start:
+                    parts.extend([match.group(1), ""])
+                cursor = min(match.end(), node_end)
+            if cursor == node_start and len(parts) == 1:
+                node_start = node_end
+                continue
+            parts[-1] += text[cursor - node_start:]
+            node_plan.append((t_index, tuple(parts)))
+            node_start = node_end
+        return tuple(node_plan)
+
+    def _render_parts(self, parts, replacements):
+        pieces = list(parts)
+        for i in range(1, len(pieces), 2):
+            key = pieces[i]
+            if key not in replacements:
+                pieces[i] = f"[{key}]"
+                continue
+            value = replacements[key]
+            pieces[i] = "" if value is None or value == "nan" else str(value)
+        return "".join(pieces)
 
-    def _replace_text_in_shape(self, shape, replacements):
-        if not hasattr(shape, "text_frame"):
-            return False
-
-        text_frame = shape.text_frame
+    def _apply_render_plan(self, t_nodes, replacements, slide_index=0):
+        # t_nodes 与模板的文本节点索引一一对应，只修补计划里记录的节点
         is_changed = False
+        scanned = modified = 0
+        for node_plan in self.render_plans[slide_index]:
+            try:
+                scanned += 1
+                rendered = [(t_nodes[t_index], self._render_parts(parts, replacements))
+                            for t_index, parts in node_plan]
+                if any("\n" in text or "\v" in text for _, text in rendered):
+                    # 替换值含换行 (单元格内换行)：需要生成 a:br，退回整段重建
+                    # a:t 的父节点是 a:r 或 a:fld，再上一层即段落 a:p
+                    paragraph = _Paragraph(rendered[0][0].getparent().getparent(), None)
+                    original_text = paragraph.text
+                    new_text = self._substitute_text(original_text, replacements)
+                    if new_text != original_text:
+                        self._set_paragraph_text(paragraph, new_text)
+                        modified += 1
+                        is_changed = True
+                    continue
+                # 只改写含占位符的 a:t，run 的格式和其余节点都不动
+                changed = False
+                for t, text in rendered:
+                    # 置空的节点写 None (<a:t/>)：与并行渲染序列化再解析后的结果逐字节一致
+                    text = text or None
+                    if t.text != text:
+                        t.text = text
+                        changed = True
+                if changed:
+                    modified += 1
+                    is_changed = True
+            except:
+                continue
+        self.stats.count("paragraphs_scanned", scanned)
+        self.stats.count("paragraphs_modified", modified)
+        return is_changed
 
-        for paragraph in text_frame.paragraphs:
-            original_text = paragraph.text
-            if not any(f"[{k}]" in original_text for k in replacements):
+    def _serialize_template_shapes(self):
+        # 模板形状只序列化一次，每页解析一次字节串即可批量得到全部克隆
+        self.template_shapes_xml = []
+        self.image_plans = []
+        self.template_relationships = []
+        self.template_backgrounds_xml = []
+        for i, template_slide in enumerate(self.template_pptx.slides):
+            template_tree = template_slide.shapes._spTree
+            container = etree.Element(qn('p:spTree'), nsmap=template_tree.nsmap)
+            for shape in template_slide.shapes:
+                container.append(copy.deepcopy(shape._element))
+            bg = template_slide._element.cSld.bg
+            # 先把图片占位符的 r:embed 换成 rIdImgN，模板里的示例图片就不会被当作引用复制到每张幻灯片
+            self.image_plans.append(self._plan_image_placeholders(container))
+
+            referenced = self._template_rel_ids(template_slide, container, bg)
+            relationships, skipped = self._collect_relationships(i, template_slide, referenced)
+            if skipped:
+                # 无法复制的引用要去掉，否则输出里会留下指向不存在关系的引用
+                self._drop_references(container, skipped)
+                referenced = self._template_rel_ids(template_slide, container, bg)
+                relationships = [rel for rel in relationships if rel[0] in referenced]
+            self.template_relationships.append(relationships)
+
+            self.template_shapes_xml.append(etree.tostring(container))
+            self.template_backgrounds_xml.append(etree.tostring(bg) if bg is not None else None)
+
+    @staticmethod
+    def _referenced_rel_ids(element):
+        # 收集元素内全部 r:embed / r:link / r:id 等关系引用
+        r_ns = '{%s}' % nsuri('r')
+        return {value for el in element.iter() for name, value in el.attrib.items() if name.startswith(r_ns)}
+
+    def _template_rel_ids(self, template_slide, container, bg):
+        # 形状和背景引用的关系ID；SmartArt 的绘图关系只在数据部件中引用，一并算上
+        referenced = self._referenced_rel_ids(container)
+        if bg is not None:
+            referenced |= self._referenced_rel_ids(bg)
+        rels = template_slide.part.rels
+        for rel_id in list(referenced):
+            rel = rels.get(rel_id)
+            if rel is not None and rel.reltype == RT.DIAGRAM_DATA and not rel.is_external:
+                referenced |= {value.decode() for value in DIAGRAM_DRAWING_REL_PATTERN.findall(rel.target_part.blob)}
+        return referenced
+
+    @staticmethod
+    def _drop_references(container, rel_ids):
+        # 去掉对指定关系的引用：超链接只去掉链接本身，其他元素去掉所在的形状 (组合内只去掉对应的子形状)
+        r_ns = '{%s}' % nsuri('r')
+        group_tags = (container.tag, qn('p:grpSp'))
+        for el in list(container.iter()):
+            if not any(name.startswith(r_ns) and value in rel_ids for name, value in el.attrib.items()):
+                continue
+            if el.tag in HYPERLINK_TAGS:
+                el.getparent().remove(el)
+                continue
+            shape = el
+            while shape.getparent() is not None and shape.getparent().tag not in group_tags:
+                shape = shape.getparent()
+            if shape.getparent() is not None:
+                shape.getparent().remove(shape)
+
+    def _collect_relationships(self, slide_index, template_slide, referenced):
+        # 记录模板幻灯片被引用的关系：[(关系ID, 类型, 外部链接, 部件名, 内容类型, 数据, 下级关系)]
+        # 图表、SmartArt 等部件的下级关系格式相同，由写入器连同下级部件一起复制；
+        # 指向其他幻灯片等无法复制的关系ID另行返回，由调用方去掉对应的超链接或形状
+        relationships = []
+        skipped = set()
+        rels = template_slide.part.rels
+        for rel_id in sorted(referenced):
+            if rel_id not in rels:
+                continue
+            rel = rels[rel_id]
+            if rel.is_external:
+                relationships.append((rel_id, rel.reltype, rel.target_ref, None, None, None, None))
+                continue
+            part = rel.target_part
+            children = self._part_relationships(part) if len(part.rels) else None
+            if part.content_type in STRUCTURE_CONTENT_TYPES or (len(part.rels) and children is None):
+                self.log(f"模板第 {slide_index + 1} 张幻灯片中指向 {rel.reltype.rsplit('/', 1)[-1]} 的引用无法复制，"
+                         f"已去掉对应的超链接或形状")
+                skipped.add(rel_id)
+                continue
+            relationships.append((rel_id, rel.reltype, None, str(part.partname), part.content_type, part.blob,
+                                  children))
+        return relationships, skipped
+
+    def _part_relationships(self, part, ancestors=()):
+        # 部件的下级关系 (格式同上)；下级指向文档结构部件或循环引用时无法复制，返回 None
+        path = ancestors + (part.partname,)
+        children = []
+        for rel_id, rel in part.rels.items():
+            if rel.is_external:
+                children.append((rel_id, rel.reltype, rel.target_ref, None, None, None, None))
+                continue
+            target = rel.target_part
+            if target.content_type in STRUCTURE_CONTENT_TYPES or target.partname in path:
+                return None
+            grandchildren = None
+            if len(target.rels):
+                grandchildren = self._part_relationships(target, path)
+                if grandchildren is None:
+                    return None
+            children.append((rel_id, rel.reltype, None, str(target.partname), target.content_type, target.blob,
+                             grandchildren))
+        return tuple(children)
+
+    def _plan_image_placeholders(self, container):
+        # 图片占位符的 r:embed 改为固定的关系 ID (rIdImg1...)，写出时由写入器绑定到实际图片
+        image_plan = []
+        for pic in container.iter(qn('p:pic')):
+            key = self._image_placeholder_key(pic)
+            blip = pic.find('.//' + qn('a:blip'))
+            if key is None or blip is None:
                 continue
+            rel_id = f"rIdImg{len(image_plan) + 1}"
+            blip.set(qn('r:embed'), rel_id)
+            ext = pic.find(qn('p:spPr') + '/' + qn('a:xfrm') + '/' + qn('a:ext'))
+            size = (int(ext.get('cx')), int(ext.get('cy'))) if ext is not None else None
+            image_plan.append((rel_id, key, size))
+        return image_plan
+
+    def _resolve_image(self, value):
+        # 图片路径：相对路径以数据文件所在目录为基准；空值或文件不存在时返回 ""
+        if not value:
+            return ""
+        path = self._image_paths.get(value)
+        if path is None:
+            path = value if os.path.isabs(value) else os.path.join(os.path.dirname(os.path.abspath(self.excel_path)), value)
+            if not os.path.isfile(path):
+                self.log(f"图片不存在，该图片框将留空: {value}")
+                path = ""
+            self._image_paths[value] = path
+        return path
+
+    def _drop_empty_images(self, sld, image_plan, replacements):
+        # 没有图片的记录删除对应的图片框
+        empty = {rel_id for rel_id, key, _ in image_plan if not replacements.get(key)}
+        if not empty:
+            return
+        for blip in list(sld.cSld.spTree.iter(qn('a:blip'))):
+            if blip.get(qn('r:embed')) in empty:
+                pic = next(blip.iterancestors(qn('p:pic')))
+                pic.getparent().remove(pic)
+
+    def _page_images(self, replacements):
+        # 每张幻灯片要绑定的图片: [(关系ID, 图片路径, (宽, 高))]
+        return [[(rel_id, replacements[key], size) for rel_id, key, size in image_plan if replacements.get(key)]
+                for image_plan in self.image_plans]
+
+    def _clone_template_shapes(self, spTree, slide_index=0):
+        # 一次性插入到 p:extLst 之前，返回克隆中的全部文本节点 (与渲染计划的索引一致)
+        container = parse_xml(self.template_shapes_xml[slide_index])
+        t_nodes = _XPATH_TEXT_NODES(container)
+        ext_lst = spTree.find(qn('p:extLst'))
+        insert_at = spTree.index(ext_lst) if ext_lst is not None else len(spTree)
+        spTree[insert_at:insert_at] = list(container)
+        return t_nodes
+
+    def _substitute_text(self, text, replacements):
+        # 单次扫描完成替换，每个匹配只做一次字典查找
+        def lookup(match):
+            key = match.group(1)
+            if key not in replacements:
+                return match.group(0)
+            value = replacements[key]
+            return "" if value is None or value == "nan" else str(value)
+
+        return self.placeholder_regex.sub(lookup, text)
+
+    def _set_paragraph_text(self, paragraph, new_text):
+        # 保存格式
+        font_name = font_size = font_bold = font_italic = font_underline = font_color_rgb = None
+        if len(paragraph.runs) > 0:
+            ref_font = paragraph.runs[0].font
+            font_name = ref_font.name
+            font_size = ref_font.size
+            font_bold = ref_font.bold
+            font_italic = ref_font.italic
+            font_underline = ref_font.underline
+            try:
+                if hasattr(ref_font.color, 'rgb'):
+                    font_color_rgb = ref_font.color.rgb
+            except:
+                pass
+
+        paragraph.text = new_text
+        # 恢复格式
+        if len(paragraph.runs) > 0:
+            new_run = paragraph.runs[0]
+            new_run.font.name = font_name
+            new_run.font.size = font_size
+            new_run.font.bold = font_bold
+            new_run.font.italic = font_italic
+            new_run.font.underline = font_underline
+            if font_color_rgb:
+                new_run.font.color.rgb = font_color_rgb
+
+    def _new_output_presentation(self, keep_template=True):
+        # keep_template=False 时改用空白演示文稿的默认母版，模板母版上的背景、徽标等装饰不会出现在输出中
+        if keep_template:
+            # 以模板自身的包为底：母版、版式、主题各保留一份，只去掉模板里的幻灯片
+            new_pptx = Presentation(self.template_path)
+            self._drop_all_slides(new_pptx)
+            return new_pptx
+        new_pptx = Presentation()
+        new_pptx.slide_width = self.template_pptx.slide_width
+        new_pptx.slide_height = self.template_pptx.slide_height
+        return new_pptx
+
+    @staticmethod
+    def _drop_all_slides(prs):
+        presentation = prs.part._element
+        sld_id_lst = prs.slides._sldIdLst
+        for sld_id in list(sld_id_lst):
+            prs.part.drop_rel(sld_id.rId)
+            sld_id_lst.remove(sld_id)
+        # 自定义放映和分节 (p14:sectionLst) 按 ID 引用原幻灯片，一并去掉以免文件需要修复
+        for cust_show_lst in presentation.findall(qn('p:custShowLst')):
+            presentation.remove(cust_show_lst)
+        for ext in presentation.findall(qn('p:extLst') + '/' + qn('p:ext')):
+            if ext.find('{http://schemas.microsoft.com/office/powerpoint/2010/main}sectionLst') is not None:
+                ext.getparent().remove(ext)
+
+    def _output_layouts(self, new_pptx, keep_template=True):
+        # 每张模板幻灯片在输出中使用的版式：保留模板包时用模板幻灯片原来的版式，否则用空白演示文稿的第一个版式
+        if not keep_template:
+            return [new_pptx.slide_layouts[0]] * len(self.template_shapes_xml)
+        layouts = {layout.part.partname: layout for master in new_pptx.slide_masters for layout in master.slide_layouts}
+        return [layouts[template_slide.slide_layout.part.partname] for template_slide in self.template_pptx.slides]
+
+    def _page_key_table(self, records_per_page):
+        # 每页的 (偏移, [(列序号, 占位符名)...])，只保留模板真正用到的占位符
+        key_table = []
+        for offset in range(records_per_page):
+            suffix = f"_{offset + 1}" if offset > 0 else ""
+            keys = [(col_index, f"{col}{suffix}") for col_index, col in enumerate(self.columns)
+                    if f"{col}{suffix}" in self.placeholders]
+            key_table.append((offset, keys))
+        return key_table
+
+    def _build_page_replacements(self, page_records, key_table):
+        replacements = {}
+
+        for offset, keys in key_table:
+            if offset < len(page_records):
+                record = page_records[offset]
+                for col_index, key in keys:
+                    replacements[key] = record[col_index]
+            else:
+                for col_index, key in keys:
+                    replacements[key] = ""
+        for key in self.image_keys:
+            if key in replacements:
+                replacements[key] = self._resolve_image(replacements[key])
+        return replacements
+
+    def _iter_pages(self, records_per_page):
+        # 逐页产出 (首行号, 末行号, 替换字典, None)；records 可以是列表，也可以是流式读取的迭代器
+        # 末项留给已渲染好的幻灯片 (增量缓存命中时填入)
+        key_table = self._page_key_table(records_per_page)
+        page_records = []
+        first_row = 1
+        for record in self.records:
+            page_records.append(record)
+            if len(page_records) == records_per_page:
+                yield (first_row, first_row + records_per_page - 1,
+                       self._build_page_replacements(page_records, key_table), None)
+                first_row += records_per_page
+                page_records = []
+        if page_records:
+            yield first_row, first_row + len(page_records) - 1, self._build_page_replacements(page_records, key_table), None
+
+    def _render_slide_element(self, replacements, slide_index=0):
+        # 不依赖 Presentation 对象，直接渲染出一张独立的 p:sld
+        with self.stats.phase("shape_clone"):
+            sld = CT_Slide.new()
+            t_nodes = self._clone_template_shapes(sld.cSld.spTree, slide_index)
+            if self.template_backgrounds_xml[slide_index] is not None:
+                sld.cSld.insert(0, parse_xml(self.template_backgrounds_xml[slide_index]))
+        with self.stats.phase("text_replace"):
+            self._apply_render_plan(t_nodes, replacements, slide_index)
+        if self.image_plans[slide_index]:
+            self._drop_empty_images(sld, self.image_plans[slide_index], replacements)
+        return sld
+
+    def _render_page(self, replacements):
+        # 一页数据对应模板的全部幻灯片 (如 封面、证书、成绩单)
+        return [self._render_slide_element(replacements, i) for i in range(len(self.template_shapes_xml))]
+
+    def _open_writer(self, output_path, streaming, keep_template=True, compression=None, compress_threads=1):
+        new_pptx = self._new_output_presentation(keep_template)
+        layouts = self._output_layouts(new_pptx, keep_template)
+        if streaming:
+            return StreamingPptxWriter(output_path, new_pptx, self.image_store, self.template_relationships, layouts,
+                                       compression, compress_threads)
+        return PresentationWriter(output_path, new_pptx, layouts, self.image_store, self.template_relationships,
+                                  compression, compress_threads)
+
+    def _iter_cached_pages(self, pages, cache, page_keys):
+        # 命中缓存的页面用已渲染好的幻灯片列表代替替换字典，渲染阶段直接跳过
+        # page_keys 按页序记录 (缓存键, 是否需要写入缓存)，由主循环按同样顺序取出
+        for first_row, last_row, replacements, _ in pages:
+            key = cache.key(replacements)
+            cached = cache.get(key)
+            page_keys.append((key, cached is None))
+            yield first_row, last_row, replacements, cached
+
+    def _iter_rendered_slides(self, pages):
+        # 逐页产出 (首行号, 末行号, 替换字典, 该页的幻灯片列表)
+        for first_row, last_row, replacements, rendered in pages:
+            if rendered is None:
+                rendered = self._render_page(replacements)
+            yield first_row, last_row, replacements, rendered
+
+    def _iter_in_workers(self, items, submit, workers, chunk_size=32, executor=None):
+        # 按块提交给进程池，按提交顺序产出 (块, 结果)，保证输出顺序与串行一致
+        # 传入 executor 时使用共享进程池 (批量任务)，不负责关闭它
+        if executor is None:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                yield from self._iter_in_workers(items, submit, workers, chunk_size, executor)
+            return
 
-            # 保存格式
-            font_name = font_size = font_bold = font_italic = font_underline = font_color_rgb = None
-            if len(paragraph.runs) > 0:
-                ref_font = paragraph.runs[0].font
-                font_name = ref_font.name
-                font_size = ref_font.size
-                font_bold = ref_font.bold
-                font_italic = ref_font.italic
-                font_underline = ref_font.underline
-                try:
-                    if hasattr(ref_font.color, 'rgb'):
-                        font_color_rgb = ref_font.color.rgb
-                except:
-                    pass
-
-            new_text = original_text
-            sorted_keys = sorted(replacements.keys(), key=len, reverse=True)
-
-            for placeholder in sorted_keys:
-                value = replacements[placeholder]
-                if value == "nan" or value is None:
-                    value = ""
-                pattern = r'\[' + re.escape(placeholder) + r'\]'
-                new_text = re.sub(pattern, str(value), new_text)
-
-            if new_text != original_text:
-                paragraph.text = new_text
-                # 恢复格式
-                if len(paragraph.runs) > 0:
-                    new_run = paragraph.runs[0]
-                    new_run.font.name = font_name
-                    new_run.font.size = font_size
-                    new_run.font.bold = font_bold
-                    new_run.font.italic = font_italic
-                    new_run.font.underline = font_underline
-                    if font_color_rgb:
-                        new_run.font.color.rgb = font_color_rgb
-                is_changed = True
-        return is_changed
+        def iter_chunks():
+            chunk = []
+            for item in items:
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        pending = deque()
+        try:
+            for chunk in iter_chunks():
+                pending.append((chunk, submit(executor, chunk)))
+                # 限制在途任务数量，避免结果堆积占用内存
+                if len(pending) >= workers * 2:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        finally:
+            # 提前结束 (出错或取消) 时撤回尚未开始的任务，共享进程池不被占用
+            for _, future in pending:
+                future.cancel()
+
+    def _iter_rendered_slides_parallel(self, pages, workers, chunk_size=32, executor=None):
+        # 页面按块分发给进程池；替换字典只含模板用到的占位符，进程间序列化开销很小
+        def submit(executor, chunk):
+            # 已缓存的页面不发给工作进程
+            return executor.submit(_render_pages_in_worker, self.template_path,
+                                   [replacements if rendered is None else None
+                                    for _, _, replacements, rendered in chunk])
+
+        for chunk, (slides, worker_stats) in self._iter_in_workers(pages, submit, workers, chunk_size, executor):
+            # 克隆与替换发生在工作进程中，统计随结果带回
+            self.stats.merge(worker_stats)
+            for (first_row, last_row, replacements, rendered), page_slides in zip(chunk, slides):
+                yield first_row, last_row, replacements, rendered if rendered is not None else page_slides
+
+    # ==========================================
+    # 按记录出文件：每条记录一个 pptx，全部写入同一个 zip
+    # ==========================================
+    def _record_file_name(self, record, row_number, used_names):
+        # 文件名模板中的 [列名] 换成该记录的值；去掉文件名非法字符，重名时追加序号
+        pattern = self.file_name_pattern or "[#]"
+        values = {col: record[i] for i, col in enumerate(self.columns) if col in self.file_name_columns}
+        values["#"] = str(row_number)
+        name = FILE_NAME_FIELD_PATTERN.sub(lambda m: str(values.get(m.group(1), "")), pattern)
+        name = re.sub(r'[\\/:*?"<>|\r\n\t]', '_', name).strip().strip('.')
+        stem, ext = os.path.splitext(name)
+        if ext.lower() != '.pptx':
+            stem, ext = name, '.pptx'
+        stem = stem or str(row_number)
+        name = stem + ext
+        # used_names: {小写文件名: 该名称已试到的序号}；追加的序号也可能与其他记录的原名相同，跳过已用的名称
+        number = used_names.get(name.lower())
+        if number is not None:
+            candidate = name
+            while candidate.lower() in used_names:
+                number += 1
+                candidate = f"{stem}_{number}{ext}"
+            used_names[name.lower()] = number
+            name = candidate
+        used_names[name.lower()] = 1
+        return name
+
+    def _iter_record_pages(self):
+        # 逐条产出 (行号, 文件名, 替换字典)
+        key_table = self._page_key_table(1)
+        used_names = {}
+        for row_number, record in enumerate(self.records, 1):
+            yield (row_number, self._record_file_name(record, row_number, used_names),
+                   self._build_page_replacements([record], key_table))
+
+    def _render_record_file(self, replacements, keep_template=True, compression=None):
+        # 一条记录渲染为一个完整的 pptx，返回文件字节串 (不落盘)
+        skeleton = self._record_skeletons.get(keep_template)
+        if skeleton is None:
+            new_pptx = self._new_output_presentation(keep_template)
+            skeleton = PackageSkeleton(new_pptx, self._output_layouts(new_pptx, keep_template))
+            self._record_skeletons[keep_template] = skeleton
+        buffer = io.BytesIO()
+        writer = StreamingPptxWriter(buffer, skeleton, self.image_store, self.template_relationships,
+                                     compression=compression)
+        page_slides = self._render_page(replacements)
+        with self.stats.phase("slide_add"):
+            writer.add_slides(page_slides, self._page_images(replacements) if self.image_keys else None)
+        with self.stats.phase("save"):
+            writer.close()
+        return buffer.getvalue()
+
+    def _iter_record_files(self, pages, keep_template, compression):
+        for row_number, name, replacements in pages:
+            yield row_number, name, self._render_record_file(replacements, keep_template, compression)
+
+    def _iter_record_files_parallel(self, pages, workers, keep_template, compression, chunk_size=16, executor=None):
+        def submit(executor, chunk):
+            return executor.submit(_render_record_files_in_worker, self.template_path, keep_template, compression,
+                                   [replacements for _, _, replacements in chunk])
+
+        for chunk, (files, worker_stats) in self._iter_in_workers(pages, submit, workers, chunk_size, executor):
+            self.stats.merge(worker_stats)
+            for (row_number, name, _), data in zip(chunk, files):
+                yield row_number, name, data
+
+    def run_per_record_mode(self, workers=1, executor=None, keep_template=True, stats_path=None, compression=None):
+        # output_path 为 .zip：每条记录渲染成单独的 pptx，生成后直接写入 zip，不产生临时文件
+        # compression 作用于每个 pptx 内部；外层 zip 始终仅存储
+        with self.stats.phase("total"):
+            output_files = self._run_per_record_mode(workers, executor, keep_template, compression)
+        self.log(self.stats.summary())
+        if stats_path:
+            self.stats.dump_json(stats_path)
+            self.log(f"性能统计已写入: {stats_path}")
+        return output_files
+
+    def _run_per_record_mode(self, workers, executor, keep_template, compression):
+        self.log(f"正在运行：按记录出文件模式 (文件名模板 {self.file_name_pattern or '[#]'})...")
+        missing = self.file_name_columns - set(self.columns) - {"#"}
+        if missing:
+            raise ValueError(f"文件名模板中的列在数据中不存在: {sorted(missing)}")
+
+        total_rows = len(self.records) if isinstance(self.records, list) else self.estimated_rows
+        pages = self._iter_record_pages()
+        if workers > 1:
+            self.log(f"已启用并行生成: {workers} 个工作进程")
+            files = self._iter_record_files_parallel(pages, workers, keep_template, compression, executor=executor)
+        else:
+            files = self._iter_record_files(pages, keep_template, compression)
+        progress = ProgressReporter(self.progress_callback or self._log_progress, total_rows, total_rows)
 
-    def run_general_mode(self, records_per_page=1):
+        # 每个 pptx 本身已压缩，zip 中按存储方式写入
+        archive = zipfile.ZipFile(self.output_path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+        try:
+            for row_number, name, data in files:
+                self._check_cancelled()
+                if self.verbose:
+                    self.log(f"正在写入: {name} (数据行 {row_number})")
+                archive.writestr(name, data)
+                self.stats.count("files")
+                self.stats.count("rows")
+                progress.update(row_number, row_number)
+            archive.close()
+            progress.finish()
+        except:
+            files.close()
+            archive.close()
+            try:
+                os.remove(self.output_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            if self.data_source is not None:
+                self.data_source.close()
+
+        self.log(f"保存成功: {self.output_path} (共 {self.stats.counters.get('files', 0)} 个文件)")
+        return [self.output_path]
+
+    def run_general_mode(self, records_per_page=1, streaming=False, workers=1,
+                         max_slides_per_file=None, max_bytes_per_file=None, index_path=None, executor=None,
+                         stats_path=None, cache_path=None, keep_template=True, pdf_exporter=None,
+                         compression=None, compress_threads=1):
+        # compression: 输出 zip 的压缩级别 0-9 (0 为仅存储，None 为默认)；compress_threads > 1 时并行压缩部件
+        with self.stats.phase("total"):
+            output_files = self._run_general_mode(records_per_page, streaming, workers, max_slides_per_file,
+                                                  max_bytes_per_file, index_path, executor, cache_path,
+                                                  keep_template, pdf_exporter, compression, compress_threads)
+        self.log(self.stats.summary())
+        if stats_path:
+            self.stats.dump_json(stats_path)
+            self.log(f"性能统计已写入: {stats_path}")
+        return output_files
+
+    def _run_general_mode(self, records_per_page, streaming, workers, max_slides_per_file, max_bytes_per_file,
+                          index_path, executor, cache_path, keep_template, pdf_exporter, compression,
+                          compress_threads):
         mode_name = "Single" if records_per_page == 1 else f"{records_per_page}-Up"
         self.log(f"正在运行：{mode_name} 融合模式 (每页 {records_per_page} 个)...")
 
-        new_pptx = Presentation()
-        new_pptx.slide_width = self.template_pptx.slide_width
-        new_pptx.slide_height = self.template_pptx.slide_height
+        if max_bytes_per_file and not streaming:
+            # 只有流式写入才能随时知道已写出的字节数
+            streaming = True
+            self.log("按大小分片需要流式输出，已自动启用")
+        if cache_path and not streaming:
+            # 缓存的是序列化后的页面，流式写出可直接写入而不必重新解析
+            streaming = True
+            self.log("增量生成使用流式输出，已自动启用")
+        if streaming:
+            # 流式输出：每页渲染完立即写入 zip，内存占用不随行数增长
+            self.log("已启用流式输出模式")
+        if not keep_template:
+            self.log("输出使用空白母版，不沿用模板的母版、版式和主题")
+
+        if max_slides_per_file or max_bytes_per_file:
+            # 导出 PDF 时每个分片一保存就提交转换，与后续分片的生成同时进行
+            writer = ShardedWriter(self.output_path,
+                                   lambda path: self._open_writer(path, streaming, keep_template, compression,
+                                                                  compress_threads),
+                                   max_slides_per_file, max_bytes_per_file, log=self.log,
+                                   on_close=pdf_exporter.submit if pdf_exporter is not None else None)
+        else:
+            writer = self._open_writer(self.output_path, streaming, keep_template, compression, compress_threads)
+
+        total_rows = len(self.records) if isinstance(self.records, list) else self.estimated_rows
+        total_batches = math.ceil(total_rows / records_per_page) if total_rows is not None else None
+        pages = self._iter_pages(records_per_page)
+        cache = None
+        if cache_path:
+            cache = SlideCache(cache_path, self.template_path)
+            page_keys = deque()
+            pages = self._iter_cached_pages(pages, cache, page_keys)
+        progress = ProgressReporter(self.progress_callback or self._log_progress, total_batches, total_rows)
+
+        if workers > 1:
+            self.log(f"已启用并行生成: {workers} 个工作进程")
+            slides = self._iter_rendered_slides_parallel(pages, workers, executor=executor)
+        else:
+            slides = self._iter_rendered_slides(pages)
+
+        index_file = index_writer = None
+        if index_path:
+            # 索引文件逐行写出：数据行号 -> 输出文件及其中的页码
+            index_file = open(index_path, 'w', newline='', encoding='utf-8-sig')
+            index_writer = csv.writer(index_file)
+            index_writer.writerow(["数据行", "文件", "页码"])
+
+        try:
+            for current_batch, (first_row, last_row, replacements, page_slides) in enumerate(slides, 1):
+                self._check_cancelled()
+                if self.verbose:
+                    self.log(f"正在处理页面: {current_batch}/{total_batches or '?'} (数据行 {first_row}-{last_row})...")
+
+                if cache is not None:
+                    key, is_new = page_keys.popleft()
+                    if is_new:
+                        page_slides = [sld if isinstance(sld, bytes) else serialize_part_xml(sld)
+                                       for sld in page_slides]
+                        cache.put(key, page_slides)
+
+                page_images = self._page_images(replacements) if self.image_keys else None
+                with self.stats.phase("slide_add"):
+                    writer.add_slides(page_slides, page_images)
+                self.stats.count("pages")
+                self.stats.count("slides", len(page_slides))
+                self.stats.count("rows", last_row - first_row + 1)
+                progress.update(current_batch, last_row)
+
+                if index_writer is not None:
+                    shard_name = os.path.basename(writer.output_path)
+                    # 页码记该页数据的第一张幻灯片
+                    slide_number = writer.slide_count - len(page_slides) + 1
+                    for row_number in range(first_row, last_row + 1):
+                        index_writer.writerow([row_number, shard_name, slide_number])
+
+            with self.stats.phase("save"):
+                writer.close()
+            progress.finish()
+            if cache is not None:
+                # 只在成功完成后清理本次没用到的旧页面
+                cache.close(prune=True)
+            if pdf_exporter is not None and not isinstance(writer, ShardedWriter):
+                pdf_exporter.submit(self.output_path)
+        except:
+            # 出错或取消时先关闭渲染管线 (并行模式会回收进程池)，再删除写了一半的输出文件
+            slides.close()
+            writer.abort()
+            if pdf_exporter is not None:
+                pdf_exporter.cancel()
+            raise
+        finally:
+            if index_file is not None:
+                index_file.close()
+            if cache is not None:
+                cache.close(prune=False)
+            if self.data_source is not None:
+                self.data_source.close()
+
+        output_files = getattr(writer, 'output_files', [self.output_path])
+        if len(output_files) > 1:
+            self.log(f"保存成功: 共 {len(output_files)} 个分片文件，首个为 {output_files[0]}")
+        else:
+            self.log(f"保存成功: {output_files[0]}")
+        if index_path:
+            self.log(f"分片索引已写入: {index_path}")
+        if self.image_keys:
+            self.stats.count("image_cache_hits", self.image_store.hits)
+            self.stats.count("image_cache_misses", self.image_store.misses)
+            self.log(f"图片: 共读取 {self.image_store.misses} 次 (缓存命中 {self.image_store.hits} 次)，"
+                     f"相同内容的图片在输出中只保存一份")
+        if cache is not None:
+            self.stats.count("cache_hits", cache.hits)
+            self.stats.count("cache_misses", cache.misses)
+            self.log(f"增量生成: 复用缓存 {cache.hits} 页，重新渲染 {cache.misses} 页")
+        if pdf_exporter is not None:
+            self.log("等待 PDF 转换完成...")
+            with self.stats.phase("pdf_export"):
+                self.pdf_files, failures = pdf_exporter.wait()
+            self.stats.count("pdf_files", len(self.pdf_files))
+            self.log(f"PDF 导出完成: 成功 {len(self.pdf_files)} 个，失败 {len(failures)} 个")
+            for path, error in failures:
+                self.log(f"PDF 导出失败: {path} -> {error}")
+        return output_files
+
+
+class GenerationStats:
+    # ==========================================
+    # 性能统计：各阶段累计耗时 (秒) 与计数器
+    # 并行模式下工作进程的统计通过 take() / merge() 汇总到主进程
+    # ==========================================
+    PHASE_NAMES = {
+        "template_load": "加载模板",
+        "placeholder_extract": "解析占位符",
+        "data_load": "读取数据",
+        "shape_clone": "克隆形状",
+        "text_replace": "文本替换",
+        "slide_add": "添加页面",
+        "save": "保存",
+        "pdf_export": "等待 PDF",
+        "total": "生成总计",
+    }
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        for name, seconds in other["timings"].items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+        for name, n in other["counters"].items():
+            self.count(name, n)
+
+    def take(self):
+        # 取出当前统计并清零 (工作进程每批结果附带一次增量)
+        result = self.to_dict()
+        self.timings = {}
+        self.counters = {}
+        return result
+
+    def to_dict(self):
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+    def dump_json(self, path):
+        data = self.to_dict()
+        data["timings"] = {name: round(seconds, 4) for name, seconds in data["timings"].items()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def summary(self):
+        phases = ", ".join(f"{label} {self.timings[name]:.2f}s" for name, label in self.PHASE_NAMES.items()
+                           if name in self.timings)
+        return (f"性能统计: {phases} | 段落扫描 {self.counters.get('paragraphs_scanned', 0)}，"
+                f"实际修改 {self.counters.get('paragraphs_modified', 0)}")
+
+
+class SlideCache:
+    # ==========================================
+    # 增量生成缓存 (SQLite 单文件)：键为 模板内容 + 页面替换字典 的哈希，值为渲染好的页面 XML
+    # 每次成功运行后删除该模板本次未用到的条目，缓存大小与最近一次的输出相当
+    # ==========================================
+    # 渲染逻辑变化会改变输出时递增，使旧缓存自动失效
+    VERSION = "8"
+
+    def __init__(self, path, template_path):
+        digest = hashlib.sha256(self.VERSION.encode())
+        with open(template_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        self.template_hash = digest.hexdigest()
+        self.run_id = time.time_ns()
+        self.hits = 0
+        self.misses = 0
+        self._touched = []
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS slides "
+                         "(key TEXT PRIMARY KEY, template TEXT, run INTEGER, xml BLOB)")
+
+    def key(self, replacements):
+        payload = json.dumps(replacements, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256((self.template_hash + payload).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        row = self._db.execute("SELECT xml FROM slides WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.append((self.run_id, key))
+        return zlib.decompress(row[0]).split(b"\0")
+
+    def put(self, key, slides):
+        # 一页的多张幻灯片以 NUL 分隔存为一条 (XML 中不会出现 NUL)
+        self._db.execute("INSERT OR REPLACE INTO slides VALUES (?, ?, ?, ?)",
+                         (key, self.template_hash, self.run_id, zlib.compress(b"\0".join(slides), 1)))
+
+    def close(self, prune=True):
+        if self._db is None:
+            return
+        if prune:
+            self._db.executemany("UPDATE slides SET run = ? WHERE key = ?", self._touched)
+            self._db.execute("DELETE FROM slides WHERE template = ? AND run <> ?", (self.template_hash, self.run_id))
+        self._db.commit()
+        self._db.close()
+        self._db = None
+
+
+class ProgressReporter:
+    # ==========================================
+    # 进度事件：按时间间隔节流，事件为字典
+    # pages_done / total_pages / rows_done / total_rows / elapsed / pages_per_sec / eta / finished
+    # 总数未知 (流式读取无法预估) 时 total_* 与 eta 为 None
+    # ==========================================
+    def __init__(self, callback, total_pages=None, total_rows=None, interval=0.5):
+        self.callback = callback
+        self.total_pages = total_pages
+        self.total_rows = total_rows
+        self.interval = interval
+        self.start_time = time.perf_counter()
+        self._last_emit = None
+        self.pages_done = 0
+        self.rows_done = 0
+
+    def update(self, pages_done, rows_done):
+        self.pages_done = pages_done
+        self.rows_done = rows_done
+        now = time.perf_counter()
+        # 第一页立即报告，之后每 interval 秒最多一次
+        if self._last_emit is None or now - self._last_emit >= self.interval:
+            self._last_emit = now
+            self.callback(self._event(now, False))
+
+    def finish(self):
+        self.callback(self._event(time.perf_counter(), True))
+
+    def _event(self, now, finished):
+        elapsed = now - self.start_time
+        pages_per_sec = self.pages_done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total_pages is not None and pages_per_sec > 0:
+            eta = max(self.total_pages - self.pages_done, 0) / pages_per_sec
+        return {
+            "pages_done": self.pages_done,
+            "total_pages": self.total_pages,
+            "rows_done": self.rows_done,
+            "total_rows": self.total_rows,
+            "elapsed": elapsed,
+            "pages_per_sec": pages_per_sec,
+            "eta": 0.0 if finished else eta,
+            "finished": finished,
+        }
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def format_progress(event):
+    total = event["total_pages"] if event["total_pages"] is not None else "?"
+    text = (f"进度: {event['pages_done']}/{total} 页 (数据行 {event['rows_done']})，"
+            f"{event['pages_per_sec']:.1f} 页/秒")
+    if event["finished"]:
+        return text + f"，用时 {format_duration(event['elapsed'])}"
+    return text + f"，预计剩余 {format_duration(event['eta'])}"
+
+
+class ConsoleProgressBar:
+    # 命令行进度条：作为 progress_callback 使用，原地刷新 stderr 上的一行
+    def __init__(self, width=30, stream=None):
+        self.width = width
+        self.stream = stream or sys.stderr
+
+    def __call__(self, event):
+        total = event["total_pages"]
+        if total:
+            filled = int(self.width * min(event["pages_done"] / total, 1.0))
+            bar = "#" * filled + "-" * (self.width - filled)
+            head = f"[{bar}] {event['pages_done']}/{total} 页"
+        else:
+            head = f"{event['pages_done']} 页"
+        tail = (f"用时 {format_duration(event['elapsed'])}" if event["finished"]
+                else f"剩余 {format_duration(event['eta'])}")
+        self.stream.write(f"\r{head}  {event['pages_per_sec']:.1f} 页/秒  {tail}  ")
+        if event["finished"]:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class DataSource:
+    # ==========================================
+    # 数据源接口：open(column_filter) 读取表头 (可整体读入的格式同时读入数据)，
+    # 只保留 column_filter 选中的列；load_records() 返回字符串元组 (列表或迭代器)
+    # ==========================================
+    kind = "数据"
+
+    def __init__(self, path):
+        self.path = path
+        self.frame = None
+        self.columns = []
+        self.total_columns = None
+        self.estimated_rows = None
+        self.column_filter = None
+
+    def open(self, column_filter=None):
+        self.column_filter = column_filter or (lambda name: True)
+        frame = self._read_frame()
+        frame.columns = [str(col).strip() for col in frame.columns]
+        if self.total_columns is None:
+            self.total_columns = len(frame.columns)
+        # 读取阶段无法裁剪的格式 (如 JSON Lines) 在这里补一次裁剪
+        keep = [i for i, col in enumerate(frame.columns) if self.column_filter(col)]
+        if len(keep) != len(frame.columns):
+            frame = frame.iloc[:, keep]
+        self.frame = frame
+        self.columns = list(frame.columns)
+        self.estimated_rows = len(frame)
+
+    def _wanted_columns(self, header):
+        # 表头 -> 需要读取的原始列名 (列名两端空白不影响匹配)
+        self.total_columns = len(header)
+        wanted = [name for name in header if self.column_filter(str(name).strip())]
+        # 一列都不需要时仍读第一列 (open 中再去掉)，否则读出的行数为 0
+        return wanted or list(header[:1])
+
+    def _read_frame(self):
+        raise NotImplementedError
+
+    def load_records(self):
+        return self._frame_records(self.frame)
+
+    @staticmethod
+    def _frame_records(frame):
+        # 一次性向量化完成 NaN 置空、转字符串、去空白
+        if not len(frame.columns):
+            # 模板没有用到任何列 (静态模板或占位符写错)：itertuples 不产出行，按行数补空记录
+            return [()] * len(frame)
+        missing = frame.isna()
+        frame = frame.astype(str).apply(lambda x: x.str.strip()).mask(missing, "")
+        return list(frame.itertuples(index=False, name=None))
+
+    def close(self):
+        pass
+
+
+class ExcelDataSource(DataSource):
+    kind = "Excel"
+
+    def _read_frame(self):
+        seen = set()
+
+        def use_column(name):
+            seen.add(name)
+            self.total_columns = len(seen)
+            return self.column_filter(str(name).strip())
+
+        try:
+            engine = 'openpyxl'
+            frame = pd.read_excel(self.path, engine=engine, usecols=use_column)
+        except:
+            seen.clear()
+            engine = 'xlrd'
+            frame = pd.read_excel(self.path, engine=engine, usecols=use_column)
+        if not len(frame.columns) and seen:
+            # 一列都不需要时 pandas 读出 0 行；改读第一列 (open 中再去掉) 以保留行数
+            frame = pd.read_excel(self.path, engine=engine, usecols=[0])
+        return frame
+
+
+class CsvDataSource(DataSource):
+    kind = "CSV"
+
+    def _read_frame(self):
+        # 全部按字符串读取，避免 001 变成 1、整数列混入空值后变成 1.0
+        # (pandas 的 pyarrow 引擎会先推断类型再转字符串，001 仍会变成 1，所以固定用 C 引擎)
+        # 国内导出的 CSV 常见 GBK 编码，UTF-8 解码失败时再试一次
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                header = pd.read_csv(self.path, nrows=0, encoding=encoding).columns
+                return pd.read_csv(self.path, dtype=str, engine='c', encoding=encoding,
+                                   usecols=self._wanted_columns(header))
+            except UnicodeDecodeError:
+                if encoding == 'gbk':
+                    raise
+
 
-        slide_layout = self.template_pptx.slide_layouts[0]
-        template_slide = self.template_pptx.slides[0]
-        columns = self.excel_data.columns
-        total_rows = len(self.excel_data)
+class ParquetDataSource(DataSource):
+    kind = "Parquet"
 
-        for i in range(0, total_rows, records_per_page):
-            current_batch = (i // records_per_page) + 1
-            total_batches = math.ceil(total_rows / records_per_page)
-            self.log(
-                f"正在处理页面: {current_batch}/{total_batches} (数据行 {i + 1}-{min(i + records_per_page, total_rows)})...")
+    def _read_frame(self):
+        if importlib.util.find_spec('pyarrow') is not None:
+            import pyarrow.parquet as pq
 
-            slide = new_pptx.slides.add_slide(slide_layout)
+            # 列式存储：只解码需要的列
+            header = pq.ParquetFile(self.path).schema_arrow.names
+            return pd.read_parquet(self.path, columns=self._wanted_columns(header))
+        if importlib.util.find_spec('fastparquet') is None:
+            raise ImportError("读取 Parquet 文件需要安装 pyarrow：pip install pyarrow")
+        return pd.read_parquet(self.path)
 
-            for shape in list(slide.shapes):
-                sp = shape._element
-                sp.getparent().remove(sp)
 
-            replacements = {}
+class JsonLinesDataSource(DataSource):
+    kind = "JSON Lines"
 
-            for offset in range(records_per_page):
-                data_index = i + offset
-                suffix = f"_{offset + 1}" if offset > 0 else ""
+    def _read_frame(self):
+        # dtype=False：保留原始类型，不把 "001" 之类的字符串猜成数字
+        return pd.read_json(self.path, lines=True, dtype=False)
 
-                if data_index < total_rows:
-                    row = self.excel_data.iloc[data_index]
-                    for col in columns:
-                        val = row[col]
-                        replacements[f"{col}{suffix}"] = "" if val == "nan" else str(val)
+
+class ExcelStreamDataSource(DataSource):
+    # ==========================================
+    # 流式 Excel 读取：后台线程用 openpyxl 只读模式逐行解析，
+    # 经有界队列交给渲染循环，整张表不会一次性读入内存
+    # pandas 按整列推断类型后再转字符串 (如 有空值的整数列为 90.0、全为零点的日期列只显示日期)；
+    # 流式读取无法预知后面的行，按截至当前块累计的列类型逐块按相同规则格式化：
+    # 只有列类型在已输出的块之后才改变时 (如第 2048 行之后才出现空值的整数列)，前面的行与非流式读取不同
+    # ==========================================
+    kind = "Excel"
+    _END = object()
+    CHUNK_ROWS = 2048
+    # openpyxl 只读模式把错误单元格读成字符串，pandas 读成空值
+    ERROR_VALUES = {'#NULL!', '#DIV/0!', '#VALUE!', '#REF!', '#NAME?', '#NUM!', '#N/A'}
+
+    def __init__(self, path, queue_size=1024):
+        super().__init__(path)
+        self.queue_size = queue_size
+        self._workbook = None
+        self._rows = None
+        self._positions = []
+        # 每个保留列截至当前块累计的类型信息 (见 _update_column_types)
+        self._kinds = []
+        self._has_missing = []
+        self._has_time = []
+        self._fraction_digits = []
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._error = None
+
+    def open(self, column_filter=None):
+        import openpyxl
+
+        self._workbook = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        worksheet = self._workbook.active
+        self._rows = worksheet.iter_rows(values_only=True)
+        header = next(self._rows, ())
+        # 与 pandas 保持一致：空表头记为 Unnamed: N
+        header = [str(name).strip() if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        self.total_columns = len(header)
+        self._positions = [i for i, name in enumerate(header) if column_filter is None or column_filter(name)]
+        self.columns = [header[i] for i in self._positions]
+        self.estimated_rows = worksheet.max_row - 1 if worksheet.max_row else None
+        self._kinds = [set() for _ in self._positions]
+        self._has_missing = [False] * len(self._positions)
+        self._has_time = [False] * len(self._positions)
+        self._fraction_digits = [0] * len(self._positions)
+
+    @classmethod
+    def _convert_cell(cls, value):
+        # 与 pandas 的 openpyxl 读取一致：空单元格为 ""，整数值的小数转为 int，错误值为空值
+        if value is None:
+            return ""
+        if isinstance(value, float):
+            return int(value) if value.is_integer() else value
+        if isinstance(value, str) and value in cls.ERROR_VALUES:
+            return float('nan')
+        return value
+
+    def _iter_chunks(self, rows):
+        # 按块产出用到的列 (已转换的单元格值)；与 pandas 一致：末尾的整行空白不算数据，中间的空行保留
+        chunk, blank_rows = [], []
+        for row in rows:
+            if self._stop.is_set():
+                return
+            values = [self._convert_cell(row[i]) if i < len(row) else "" for i in self._positions]
+            if all(value is None for value in row):
+                blank_rows.append(values)
+                continue
+            chunk.extend(blank_rows)
+            chunk.append(values)
+            blank_rows = []
+            if len(chunk) >= self.CHUNK_ROWS:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _parse_chunk(self, chunk, dtype=None):
+        # pandas 的 read_excel 同样经 TextParser 推断类型
+        from pandas.io.parsers import TextParser
+
+        return TextParser(chunk, header=None, names=list(range(len(self._positions))),
+                          skip_blank_lines=False, dtype=dtype).read()
+
+    def _update_column_types(self, chunk, frame):
+        # 把本块按 pandas 规则推断出的类型并入各列的累计信息
+        for i in range(len(self._positions)):
+            column = frame[i]
+            missing = column.isna()
+            self._has_missing[i] = self._has_missing[i] or bool(missing.any())
+            if missing.all():
+                continue
+            kind = getattr(column.dtype, 'kind', 'O')
+            if kind == 'f' and all(isinstance(row[i], bool) for row, gap in zip(chunk, missing) if not gap):
+                # 含空值的布尔块被解析为小数；记为布尔，合并后再按 pandas 的规则转为 1.0/0.0
+                kind = 'b'
+            self._kinds[i].add(kind)
+            if kind == 'M':
+                values = column[~missing]
+                self._has_time[i] = self._has_time[i] or bool((values != values.dt.normalize()).any())
+                if (values.dt.microsecond % 1000 != 0).any():
+                    self._fraction_digits[i] = 6
+                elif (values.dt.microsecond != 0).any():
+                    self._fraction_digits[i] = max(self._fraction_digits[i], 3)
+
+    def _column_type(self, i):
+        kinds = self._kinds[i]
+        if not kinds:
+            return 'empty'
+        if kinds == {'M'}:
+            return 'datetime'
+        if kinds == {'b'}:
+            return 'float64' if self._has_missing[i] else 'bool'
+        if kinds <= {'i', 'u', 'b'} and not self._has_missing[i]:
+            return 'uint64' if kinds == {'u'} else 'int64'
+        if kinds <= {'i', 'u', 'f', 'b'}:
+            return 'float64'
+        return 'object'
+
+    def _format_chunk(self, chunk):
+        # 对象列保持原值 (不把 "001" 猜成数字)，其余列换成累计的类型后再与 DataSource 同样转成文本
+        if not self._positions:
+            return [()] * len(chunk)
+        frame = self._parse_chunk(chunk)
+        self._update_column_types(chunk, frame)
+        column_types = [self._column_type(i) for i in range(len(self._positions))]
+        if 'object' in column_types:
+            frame = self._parse_chunk(chunk, {i: object for i, column_type in enumerate(column_types)
+                                              if column_type == 'object'})
+        for i, column_type in enumerate(column_types):
+            if column_type == 'datetime':
+                if not self._has_time[i]:
+                    text = pd.to_datetime(frame[i]).dt.strftime('%Y-%m-%d')
+                elif self._fraction_digits[i]:
+                    text = pd.to_datetime(frame[i]).dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+                    text = text.str[:-3] if self._fraction_digits[i] == 3 else text
                 else:
-                    for col in columns:
-                        replacements[f"{col}{suffix}"] = ""
+                    text = pd.to_datetime(frame[i]).dt.strftime('%Y-%m-%d %H:%M:%S')
+                frame[i] = text
+            elif column_type in ('bool', 'int64', 'uint64', 'float64'):
+                frame[i] = frame[i].astype(column_type)
+        return self._frame_records(frame)
 
-            for shape in template_slide.shapes:
+    def _produce(self):
+        try:
+            for chunk in self._iter_chunks(self._rows):
+                for item in self._format_chunk(chunk):
+                    while not self._stop.is_set():
+                        try:
+                            self._queue.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if self._stop.is_set():
+                        return
+        except Exception as e:
+            self._error = e
+        finally:
+            self._queue.put(self._END)
+
+    def load_records(self):
+        return self._iter_records()
+
+    def _iter_records(self):
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+        while True:
+            item = self._queue.get()
+            if item is self._END:
+                break
+            yield item
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            # 让生产线程能放入结束标记并退出
+            while self._thread.is_alive():
                 try:
-                    new_element = copy.deepcopy(shape._element)
-                    slide.shapes._spTree.insert_element_before(new_element, 'p:extLst')
-                except:
-                    continue
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    self._thread.join(0.05)
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+
+
+DATA_SOURCES = {
+    '.csv': CsvDataSource,
+    '.txt': CsvDataSource,
+    '.parquet': ParquetDataSource,
+    '.pq': ParquetDataSource,
+    '.jsonl': JsonLinesDataSource,
+    '.ndjson': JsonLinesDataSource,
+}
+
+
+def open_data_source(path, stream=False):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in DATA_SOURCES:
+        return DATA_SOURCES[extension](path)
+    if stream and extension in ('.xlsx', '.xlsm'):
+        return ExcelStreamDataSource(path)
+    return ExcelDataSource(path)
+
+
+class ShardedWriter:
+    # ==========================================
+    # 分片写入器：每个文件最多 K 页 (或约 N 字节)，写满立即保存并释放，
+    # 文件名为 输出名_0001.pptx、输出名_0002.pptx ...
+    # ==========================================
+    def __init__(self, output_path, open_writer, max_slides=None, max_bytes=None, log=None, on_close=None):
+        self.base_path, self.extension = os.path.splitext(output_path)
+        self.open_writer = open_writer
+        self.max_slides = max_slides
+        self.max_bytes = max_bytes
+        self.log = log or print
+        # 每个分片保存后回调 (如提交 PDF 转换)，参数为分片路径
+        self.on_close = on_close
+        self.output_files = []
+        self._current = None
+        # 当前分片打开时 (只含公共部件) 的字节数，用于估算每页的平均大小
+        self._start_bytes = 0
+        # 保存时每页还要补写的字节数 (presentation.xml、内容类型、zip 目录等)，由上一个分片实测得到
+        self._close_bytes_per_slide = 0
+
+    @property
+    def output_path(self):
+        return self._current.output_path if self._current is not None else None
+
+    @property
+    def slide_count(self):
+        return self._current.slide_count if self._current is not None else 0
+
+    def _is_full(self, incoming=1):
+        if self.max_slides and self._current.slide_count + incoming > self.max_slides:
+            return True
+        if not self.max_bytes:
+            return False
+        # 写入前按本分片已写页面的平均大小估算新页面，连同保存时补写的部分放不下就先换新分片
+        # (第一个分片还不知道补写部分的大小，可能略超上限)
+        written = self._current.bytes_written
+        slide_count = self._current.slide_count
+        per_slide = (written - self._start_bytes) / slide_count
+        projected = written + per_slide * incoming + self._close_bytes_per_slide * (slide_count + incoming)
+        return projected > self.max_bytes
+
+    def _close_current(self):
+        written = self._current.bytes_written if self.max_bytes else 0
+        self._current.close()
+        if self.max_bytes and self._current.slide_count:
+            size = os.path.getsize(self._current.output_path)
+            self._close_bytes_per_slide = max(size - written, 0) / self._current.slide_count
+        self.log(f"分片已保存: {self._current.output_path} ({self._current.slide_count} 页)")
+        path, self._current = self._current.output_path, None
+        if self.on_close is not None:
+            self.on_close(path)
+
+    def _open_next(self):
+        path = f"{self.base_path}_{len(self.output_files) + 1:04d}{self.extension}"
+        self._current = self.open_writer(path)
+        self._start_bytes = self._current.bytes_written if self.max_bytes else 0
+        self.output_files.append(path)
+
+    def add_slides(self, slides, images=None):
+        # 同一页数据的多张幻灯片放在同一个分片中
+        if self._current is not None and self._current.slide_count and self._is_full(len(slides)):
+            self._close_current()
+        if self._current is None:
+            self._open_next()
+        self._current.add_slides(slides, images)
+
+    def close(self):
+        if self._current is None and not self.output_files:
+            # 没有数据时也输出一个空分片，与不分片时的行为保持一致
+            self._open_next()
+        if self._current is not None:
+            self._close_current()
+
+    def abort(self):
+        if self._current is not None:
+            self._current.abort()
+            self._current = None
+
+
+# 每个工作进程按模板路径缓存一个只含模板的生成器，模板只加载一次
+_WORKER_GENERATORS = {}
+
+
+def _render_pages_in_worker(template_path, pages):
+    generator = _WORKER_GENERATORS.get(template_path)
+    if generator is None:
+        generator = PPTGenerator(template_path, None, None)
+        _WORKER_GENERATORS[template_path] = generator
+    slides = [None if replacements is None else [serialize_part_xml(sld) for sld in generator._render_page(replacements)]
+              for replacements in pages]
+    return slides, generator.stats.take()
+
+
+def _render_record_files_in_worker(template_path, keep_template, compression, pages):
+    generator = _WORKER_GENERATORS.get(template_path)
+    if generator is None:
+        generator = PPTGenerator(template_path, None, None)
+        _WORKER_GENERATORS[template_path] = generator
+    files = [generator._render_record_file(replacements, keep_template, compression) for replacements in pages]
+    return files, generator.stats.take()
+
+
+IMAGE_CONTENT_TYPES = {
+    'png': CT.PNG, 'jpeg': CT.JPEG, 'jpg': CT.JPEG, 'gif': CT.GIF, 'bmp': CT.BMP,
+    'tif': CT.TIFF, 'tiff': CT.TIFF, 'emf': CT.X_EMF, 'wmf': CT.X_WMF,
+}
+
+
+class ImageStore:
+    # ==========================================
+    # 图片读取缓存 (LRU)：按 (路径, 图片框尺寸) 缓存读取并缩放后的图片，
+    # 同一张签名 / logo 只读取解码一次；返回 (字节串, 扩展名, SHA1) 供写入器去重
+    # ==========================================
+    EMU_PER_INCH = 914400
+
+    def __init__(self, max_entries=256, dpi=220):
+        self.max_entries = max_entries
+        # 图片像素超过图片框在该 DPI 下所需的尺寸时缩小，控制输出体积
+        self.dpi = dpi
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, path, size=None):
+        cache_key = (path, size)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(cache_key)
+            return entry
+        self.misses += 1
+        entry = self._load(path, size)
+        self._entries[cache_key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _load(self, path, size):
+        with open(path, 'rb') as f:
+            blob = f.read()
+        ext = os.path.splitext(path)[1].lstrip('.').lower() or 'png'
+        if size is not None:
+            blob, ext = self._downscale(blob, ext, size)
+        return blob, ext, hashlib.sha1(blob).hexdigest()
+
+    def _downscale(self, blob, ext, size):
+        try:
+            from PIL import Image
+        except ImportError:
+            return blob, ext
+        try:
+            image = Image.open(io.BytesIO(blob))
+            image_format = image.format
+            if image_format not in ('PNG', 'JPEG'):
+                return blob, ext
+            target_w = size[0] / self.EMU_PER_INCH * self.dpi
+            target_h = size[1] / self.EMU_PER_INCH * self.dpi
+            # 图片会被拉伸填满图片框，按较大的比例缩放，保证两个方向的清晰度都够
+            scale = max(target_w / image.width, target_h / image.height)
+            if scale >= 1:
+                return blob, ext
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.LANCZOS)
+            output = io.BytesIO()
+            if image_format == 'JPEG':
+                image.save(output, 'JPEG', quality=90)
+                return output.getvalue(), 'jpeg'
+            image.save(output, 'PNG', optimize=True)
+            return output.getvalue(), 'png'
+        except Exception:
+            # 无法识别的图片按原样写入
+            return blob, ext
 
-            for shape in slide.shapes:
-                try:
-                    self._replace_text_in_shape(shape, replacements)
-                except:
-                    continue
 
-        new_pptx.save(self.output_path)
-        self.log(f"保存成功: {self.output_path}")
+class PresentationWriter:
+    # ==========================================
+    # 内存写入器：沿用 python-pptx 的 Presentation，结束时一次性保存
+    # ==========================================
+    def __init__(self, output_path, new_pptx, slide_layouts, image_store=None, template_relationships=None,
+                 compression=None, threads=1):
+        self.output_path = output_path
+        # 保存时的压缩级别 (0-9，0 为仅存储) 与压缩线程数；都为默认值时直接用 python-pptx 保存
+        self.compression = compression
+        self.threads = threads
+        self.new_pptx = new_pptx
+        # 每张模板幻灯片对应的输出版式
+        self.slide_layouts = slide_layouts
+        self.image_store = image_store
+        self.template_relationships = template_relationships or []
+        self.slide_count = 0
+        self.bytes_written = 0
+        # 模板中的图片、音视频部件只创建一次：{模板部件名: 输出部件}
+        self._shared_parts = {}
+        # 数据中的图片按 ImageStore 给出的 SHA1 去重：{sha1: 图片部件}
+        self._image_parts = {}
+        # 新部件名自行编号 (package.next_partname 每次都要遍历整个包)：已用部件名及各类部件的当前编号
+        self._partnames = None
+        self._partname_numbers = {}
+        # 幻灯片 ID 自行递增 (add_sldId 每次都要扫描全部 sldId)
+        self._last_slide_id = max([255] + [sld_id.id for sld_id in new_pptx.slides._sldIdLst.sldId_lst])
+
+    def _next_partname(self, partname):
+        # 与模板部件同类的下一个未用部件名，如 /ppt/charts/chart1.xml -> /ppt/charts/chart2.xml
+        if self._partnames is None:
+            self._partnames = {str(part.partname) for part in self.new_pptx.part.package.iter_parts()}
+        base, ext = posixpath.splitext(partname)
+        template = re.sub(r'\d*$', '', base) + '%d' + ext
+        number = self._partname_numbers.get(template, 0) + 1
+        while template % number in self._partnames:
+            number += 1
+        self._partname_numbers[template] = number
+        self._partnames.add(template % number)
+        return PackURI(template % number)
+
+    def _relate_template_parts(self, source_part, relationships):
+        # 把模板关系挂到新部件 (幻灯片或复制出的图表等) 上，返回 {模板关系ID: 新关系ID}
+        rel_ids = {}
+        diagram_parts = []
+        for rel_id, reltype, target_ref, partname, content_type, blob, children in relationships:
+            if target_ref is not None:
+                rel_ids[rel_id] = source_part.relate_to(target_ref, reltype, is_external=True)
+                continue
+            part = self._template_part(reltype, partname, content_type, blob, children)
+            rel_ids[rel_id] = source_part.relate_to(part, reltype)
+            if reltype == RT.DIAGRAM_DATA and isinstance(part, XmlPart):
+                diagram_parts.append(part)
+        # SmartArt 数据部件中的 relId 指向幻灯片上的绘图关系，随幻灯片的关系ID一起改写
+        for part in diagram_parts:
+            for el in part._element.iter():
+                if el.get('relId') in rel_ids:
+                    el.set('relId', rel_ids[el.get('relId')])
+        return rel_ids
+
+    def _template_part(self, reltype, partname, content_type, blob, children):
+        # 图片、音视频部件所有幻灯片共用一份；图表、SmartArt 等连同下级部件每张幻灯片复制一份
+        package = self.new_pptx.part.package
+        if children is None and reltype in SHARED_PART_RELTYPES:
+            part = self._shared_parts.get(partname)
+            if part is None:
+                part = Part(self._next_partname(partname), content_type, package, blob)
+                self._shared_parts[partname] = part
+            return part
+        if not content_type.endswith('xml'):
+            # 嵌入的工作簿等二进制部件没有下级关系，原样复制
+            return Part(self._next_partname(partname), content_type, package, blob)
+        element = parse_xml(blob)
+        part = XmlPart(self._next_partname(partname), content_type, package, element)
+        self._remap_rel_ids(element, self._relate_template_parts(part, children or ()))
+        return part
+
+    @staticmethod
+    def _remap_rel_ids(element, rel_ids):
+        if not rel_ids:
+            return
+        r_ns = '{%s}' % nsuri('r')
+        for el in element.iter():
+            for name, value in el.attrib.items():
+                if name.startswith(r_ns) and value in rel_ids:
+                    el.set(name, rel_ids[value])
+
+    def add_slide(self, sld, images=(), slide_index=0):
+        if isinstance(sld, bytes):
+            sld = parse_xml(sld)
+        self.slide_count += 1
+        # 渲染好的 p:sld 直接作为新幻灯片部件，不再经过 add_slide 生成占位符再逐个删除
+        presentation_part = self.new_pptx.part
+        slide_part = SlidePart(presentation_part._next_slide_partname, CT.PML_SLIDE, presentation_part.package, sld)
+        slide_part.relate_to(self.slide_layouts[slide_index].part, RT.SLIDE_LAYOUT)
+        # 新幻灯片不会与已有关系重复，直接添加，省去 relate_to 对演示文稿全部关系的查找
+        self._last_slide_id += 1
+        self.new_pptx.slides._sldIdLst._add_sldId(id=self._last_slide_id,
+                                                  rId=presentation_part.rels._add_relationship(RT.SLIDE, slide_part))
+
+        # 模板的图片/超链接/图表关系和图片占位符的 rIdImgN 统一换成新幻灯片上的关系 ID
+        relationships = self.template_relationships[slide_index] if slide_index < len(self.template_relationships) else ()
+        rel_ids = self._relate_template_parts(slide_part, relationships)
+        for rel_id, path, size in images:
+            # 相同图片只保存一份；不用 get_or_add_image_part，它每次都重新计算 SHA1 并遍历整个包
+            blob, ext, sha1 = self.image_store.get(path, size)
+            part = self._image_parts.get(sha1)
+            if part is None:
+                part = ImagePart(self._next_partname(f"/ppt/media/image.{ext}"),
+                                 IMAGE_CONTENT_TYPES.get(ext, 'image/' + ext), presentation_part.package, blob)
+                self._image_parts[sha1] = part
+            rel_ids[rel_id] = slide_part.relate_to(part, RT.IMAGE)
+        self._remap_rel_ids(sld.cSld, rel_ids)
+
+    def add_slides(self, slides, images=None):
+        for i, sld in enumerate(slides):
+            self.add_slide(sld, images[i] if images else (), i)
+
+    def close(self):
+        if self.compression is None and self.threads <= 1:
+            self.new_pptx.save(self.output_path)
+        else:
+            writer = ZipPartWriter(self.output_path, self.compression, self.threads)
+            try:
+                save_package(self.new_pptx.part.package, writer)
+            except:
+                writer.abort()
+                raise
+            writer.close()
+        self.new_pptx = None
+
+    def abort(self):
+        self.new_pptx = None
+
+
+def _compress_part(name, data, level):
+    # 在线程池中运行：zlib 压缩和 CRC 计算期间会释放 GIL
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return name, compressor.compress(data) + compressor.flush(), zlib.crc32(data), len(data)
+
+
+def _compress_parts(parts, level):
+    return [_compress_part(name, data, level) for name, data in parts]
+
+
+class ZipPartWriter:
+    # ==========================================
+    # 输出 zip 写入：压缩级别可调 (0 为仅存储，适合中间文件)；
+    # threads > 1 时部件先在线程池中压缩，再按提交顺序依次写入，文件内容与串行写入一致
+    # ==========================================
+    # 单张幻灯片的 XML 很小，攒够约 1MB 再作为一个任务提交，减少线程调度开销
+    BATCH_BYTES = 1024 * 1024
+    # 直接写入已压缩数据要用到的 ZipFile 内部属性；当前 Python 版本缺少时改为解压后正常写入
+    RAW_WRITE_ATTRS = ('_lock', '_seekable', '_writecheck', '_didModify', 'start_dir')
+
+    def __init__(self, file, compression=None, threads=1):
+        # compression 为 None 时使用 zlib 默认级别 6
+        self.level = 6 if compression is None else compression
+        if self.level not in range(10):
+            raise ValueError(f"压缩级别应为 0-9: {compression}")
+        if self.level:
+            self._zip = zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.level)
+        else:
+            self._zip = zipfile.ZipFile(file, 'w', zipfile.ZIP_STORED)
+        self._raw_writes = all(hasattr(self._zip, name) for name in self.RAW_WRITE_ATTRS)
+        parallel = threads > 1 and self.level and self._raw_writes
+        self._pool = ThreadPoolExecutor(max_workers=threads) if parallel else None
+        # 在途压缩任务上限，避免未写出的数据堆积
+        self._max_pending = threads * 4
+        self._pending = deque()
+        self._batch = []
+        self._batch_bytes = 0
+        # 尚未写入 zip 的部件原始大小，以及已写入部件的原始/压缩大小 (用于估算在途部件压缩后的大小)
+        self._pending_bytes = 0
+        self._raw_bytes = 0
+        self._compressed_bytes = 0
+
+    @property
+    def bytes_written(self):
+        # 并行压缩时还有部件在线程池中，按已写入部件的压缩率计入，按大小分片才不会超出上限
+        if self._pending_bytes and not self._raw_bytes:
+            # 还没有写出过并行压缩的部件，先写出在途部件得到压缩率 (每个文件只发生一次)
+            self._flush()
+        written = self._zip.fp.tell() if self._zip.fp is not None else 0
+        if not self._pending_bytes:
+            return written
+        return written + int(self._pending_bytes * self._compressed_bytes / self._raw_bytes)
+
+    def writestr(self, name, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if self._pool is None:
+            self._zip.writestr(name, data)
+            return
+        self._batch.append((name, data))
+        self._batch_bytes += len(data)
+        self._pending_bytes += len(data)
+        if self._batch_bytes >= self.BATCH_BYTES:
+            self._submit_batch()
+        while len(self._pending) > self._max_pending:
+            self._write_batch(self._pending.popleft().result())
+
+    def _submit_batch(self):
+        if self._batch:
+            self._pending.append(self._pool.submit(_compress_parts, self._batch, self.level))
+            self._batch = []
+            self._batch_bytes = 0
+
+    def _write_batch(self, entries):
+        for name, compressed, crc, size in entries:
+            self._write_raw(name, compressed, crc, size)
+            self._pending_bytes -= size
+            self._raw_bytes += size
+            self._compressed_bytes += len(compressed)
+
+    def write_compressed(self, name, compressed, crc, size):
+        # 写入已压缩好的 deflate 数据 (如预先压缩的公共部件)
+        self._flush()
+        self._write_raw(name, compressed, crc, size)
+
+    def _write_raw(self, name, compressed, crc, size):
+        # 与 ZipFile.writestr 的写法一致，只是数据已压缩好
+        if not self._raw_writes:
+            self._zip.writestr(name, zlib.decompress(compressed, -15))
+            return
+        zinfo = zipfile.ZipInfo(name, time.localtime(time.time())[:6])
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        zinfo.external_attr = 0o600 << 16
+        zinfo.file_size = size
+        zinfo.compress_size = len(compressed)
+        zinfo.CRC = crc
+        archive = self._zip
+        with archive._lock:
+            if archive._seekable:
+                archive.fp.seek(archive.start_dir)
+            zinfo.header_offset = archive.fp.tell()
+            archive._writecheck(zinfo)
+            archive._didModify = True
+            archive.fp.write(zinfo.FileHeader(size > zipfile.ZIP64_LIMIT or len(compressed) > zipfile.ZIP64_LIMIT))
+            archive.fp.write(compressed)
+            archive.filelist.append(zinfo)
+            archive.NameToInfo[name] = zinfo
+            archive.start_dir = archive.fp.tell()
+
+    def _flush(self):
+        # 先写出排在前面的部件，保证写入顺序
+        if self._pool is None:
+            return
+        self._submit_batch()
+        while self._pending:
+            self._write_batch(self._pending.popleft().result())
+
+    def close(self):
+        self._flush()
+        self._zip.close()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def abort(self):
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._batch = []
+        self._pending_bytes = 0
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._zip.close()
+
+
+def save_package(package, writer):
+    # 与 python-pptx 的 Package.save 写出相同的部件，但经由 ZipPartWriter (可调压缩级别、并行压缩)
+    if _ContentTypesItem is None or not hasattr(package, '_rels'):
+        # 用到的 python-pptx 内部接口不存在：先按默认方式保存，再逐个部件转写
+        buffer = io.BytesIO()
+        package.save(buffer)
+        with zipfile.ZipFile(buffer) as source:
+            for name in source.namelist():
+                writer.writestr(name, source.read(name))
+        return
+    parts = tuple(package.iter_parts())
+    writer.writestr(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+    writer.writestr(PACKAGE_URI.rels_uri.membername, package._rels.xml)
+    for part in parts:
+        writer.writestr(part.partname.membername, part.blob)
+        if part._rels:
+            writer.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+
+class PackageSkeleton:
+    # ==========================================
+    # 输出包的公共部件 (母版、版式、主题等) 预先保存一次，
+    # 每个输出文件直接复制这些部件；按记录逐个出文件时省去重复保存
+    # ==========================================
+    def __init__(self, presentation, slide_layouts=None):
+        # presentation 为不含幻灯片的 Presentation；slide_layouts 为每张模板幻灯片对应的版式
+        presentation_part = presentation.part
+        self.presentation_name = presentation_part.partname.lstrip('/')
+        self.presentation_rels_name = presentation_part.partname.rels_uri.lstrip('/')
+        self.slide_dir = posixpath.join(posixpath.dirname(presentation_part.partname), 'slides')
+        self.media_dir = posixpath.join(posixpath.dirname(presentation_part.partname), 'media')
+        # 每张模板幻灯片对应的版式部件 (相对幻灯片目录)
+        self.layout_targets = [posixpath.relpath(layout.part.partname, self.slide_dir)
+                               for layout in (slide_layouts or [presentation.slide_layouts[0]])]
+
+        buffer = io.BytesIO()
+        presentation.save(buffer)
+
+        self.parts = []
+        self.presentation_xml = self.presentation_rels = self.content_types = None
+        with zipfile.ZipFile(buffer) as source:
+            self.part_names = set(source.namelist())
+            for name in source.namelist():
+                data = source.read(name)
+                if name == '[Content_Types].xml':
+                    self.content_types = data
+                elif name == self.presentation_name:
+                    self.presentation_xml = data
+                elif name == self.presentation_rels_name:
+                    self.presentation_rels = data
+                else:
+                    self.parts.append((name, data))
+        # 各压缩级别下预先压缩好的公共部件：{级别: [(部件名, 压缩数据, CRC, 原始大小)]}
+        self._compressed = {}
+
+    def compressed_parts(self, level):
+        # 每个输出文件都要写一遍公共部件，同一级别只压缩一次
+        if level not in self._compressed:
+            self._compressed[level] = [_compress_part(name, data, level) for name, data in self.parts]
+        return self._compressed[level]
+
+
+class StreamingPptxWriter:
+    # ==========================================
+    # 流式 .pptx 写入器：幻灯片部件逐页写入 zip，
+    # 结束时再补写 presentation.xml / 关系 / 内容类型
+    # ==========================================
+    def __init__(self, output_path, skeleton, image_store=None, template_relationships=None, slide_layouts=None,
+                 compression=None, threads=1):
+        # skeleton 为不含幻灯片的 Presentation 或已保存好的 PackageSkeleton；output_path 也可以是可写的文件对象
+        self.output_path = output_path
+        self.image_store = image_store
+        self.template_relationships = template_relationships or []
+        self.slide_count = 0
+        # 图片与模板媒体按内容 SHA1 去重：{sha1: 部件名}
+        self._media = {}
+        self._media_types = {}
+        # 每张幻灯片复制的图表、SmartArt 等部件：[(部件名, 内容类型)]，以及各类部件的当前编号
+        self._overrides = []
+        self._copy_numbers = {}
+
+        if not isinstance(skeleton, PackageSkeleton):
+            skeleton = PackageSkeleton(skeleton, slide_layouts)
+        self._presentation_name = skeleton.presentation_name
+        self._presentation_rels_name = skeleton.presentation_rels_name
+        self._slide_dir = skeleton.slide_dir
+        self._media_dir = skeleton.media_dir
+        self._layout_targets = skeleton.layout_targets
+        self._presentation_xml = skeleton.presentation_xml
+        self._presentation_rels = skeleton.presentation_rels
+        self._content_types = skeleton.content_types
+        self._part_names = set(skeleton.part_names)
+
+        self._zip = ZipPartWriter(output_path, compression, threads)
+        if self._zip.level:
+            for entry in skeleton.compressed_parts(self._zip.level):
+                self._zip.write_compressed(*entry)
+        else:
+            for name, data in skeleton.parts:
+                self._zip.writestr(name, data)
+
+    @property
+    def bytes_written(self):
+        return self._zip.bytes_written
+
+    def _store_media(self, blob, ext, content_type, sha1=None, stem="image"):
+        # 相同内容只写入一次，返回部件名
+        sha1 = sha1 or hashlib.sha1(blob).hexdigest()
+        partname = self._media.get(sha1)
+        if partname is None:
+            number = len(self._media) + 1
+            partname = posixpath.join(self._media_dir, f"{stem}{number}.{ext}")
+            while partname.lstrip('/') in self._part_names:
+                number += 1
+                partname = posixpath.join(self._media_dir, f"{stem}{number}.{ext}")
+            self._zip.writestr(partname.lstrip('/'), blob)
+            self._part_names.add(partname.lstrip('/'))
+            self._media[sha1] = partname
+            self._media_types.setdefault(ext, content_type)
+        return partname
+
+    def _add_media(self, path, size):
+        blob, ext, sha1 = self.image_store.get(path, size)
+        return self._store_media(blob, ext, IMAGE_CONTENT_TYPES.get(ext, 'image/' + ext), sha1)
+
+    def _add_template_relationships(self, rels, source_dir, relationships):
+        # 模板关系ID原样保留；图片、音视频所有幻灯片指向同一份，图表、SmartArt 等连同下级部件每张幻灯片复制一份
+        for rel_id, reltype, target_ref, template_partname, content_type, blob, children in relationships:
+            if target_ref is not None:
+                etree.SubElement(rels, qn('pr:Relationship'), Id=rel_id, Type=reltype,
+                                 Target=target_ref, TargetMode='External')
+                continue
+            if children is None and reltype in SHARED_PART_RELTYPES:
+                base, ext = posixpath.splitext(posixpath.basename(template_partname))
+                target = self._store_media(blob, ext.lstrip('.').lower(), content_type,
+                                           stem=re.sub(r'\d*$', '', base) or "media")
+            else:
+                target = self._copy_part(template_partname, content_type, blob, children or ())
+            etree.SubElement(rels, qn('pr:Relationship'), Id=rel_id, Type=reltype,
+                             Target=posixpath.relpath(target, source_dir))
+
+    def _copy_part(self, template_partname, content_type, blob, children):
+        # 以模板部件名编号写入一份副本 (如 /ppt/charts/chart2.xml)，返回部件名
+        base, ext = posixpath.splitext(template_partname)
+        stem = re.sub(r'\d*$', '', base)
+        number = self._copy_numbers.get(stem, 0) + 1
+        while f"{stem}{number}{ext}".lstrip('/') in self._part_names:
+            number += 1
+        self._copy_numbers[stem] = number
+        partname = f"{stem}{number}{ext}"
+        self._part_names.add(partname.lstrip('/'))
+        self._zip.writestr(partname.lstrip('/'), blob)
+        self._overrides.append((partname, content_type))
+        if children:
+            part_dir = posixpath.dirname(partname)
+            rels = etree.Element(qn('pr:Relationships'), nsmap={None: NS.OPC_RELATIONSHIPS})
+            self._add_template_relationships(rels, part_dir, children)
+            rels_name = posixpath.join(part_dir, '_rels', posixpath.basename(partname) + '.rels')
+            self._zip.writestr(rels_name.lstrip('/'), serialize_part_xml(rels))
+        return partname
+
+    def _layout_rel_id(self, used):
+        # 模板关系 ID 原样保留，版式关系另取一个不冲突的 ID
+        number = 1
+        while f"rId{number}" in used:
+            number += 1
+        return f"rId{number}"
+
+    def add_slide(self, sld, images=(), slide_index=0):
+        # sld 可以是 p:sld 元素，也可以是并行进程已序列化好的字节串
+        self.slide_count += 1
+        partname = posixpath.join(self._slide_dir, f"slide{self.slide_count}.xml")
+        rels_name = posixpath.join(self._slide_dir, '_rels', f"slide{self.slide_count}.xml.rels")
+        template_rels = self.template_relationships[slide_index] if slide_index < len(self.template_relationships) else ()
+
+        layout_target = self._layout_targets[min(slide_index, len(self._layout_targets) - 1)]
+
+        rels = etree.Element(qn('pr:Relationships'), nsmap={None: NS.OPC_RELATIONSHIPS})
+        etree.SubElement(rels, qn('pr:Relationship'), Id=self._layout_rel_id({r[0] for r in template_rels}),
+                         Type=RT.SLIDE_LAYOUT, Target=layout_target)
+        self._add_template_relationships(rels, self._slide_dir, template_rels)
+        for rel_id, path, size in images:
+            # 图片框的 r:embed 已是 rIdImgN，直接以此为关系 ID
+            media_partname = self._add_media(path, size)
+            etree.SubElement(rels, qn('pr:Relationship'), Id=rel_id, Type=RT.IMAGE,
+                             Target=posixpath.relpath(media_partname, self._slide_dir))
+
+        self._zip.writestr(partname.lstrip('/'), sld if isinstance(sld, bytes) else serialize_part_xml(sld))
+        self._zip.writestr(rels_name.lstrip('/'), serialize_part_xml(rels))
+
+    def add_slides(self, slides, images=None):
+        for i, sld in enumerate(slides):
+            self.add_slide(sld, images[i] if images else (), i)
+
+    def close(self):
+        presentation = parse_xml(self._presentation_xml)
+        rels = etree.fromstring(self._presentation_rels)
+        content_types = etree.fromstring(self._content_types)
+
+        next_rid = max([int(r.get('Id')[3:]) for r in rels if r.get('Id', '').startswith('rId')
+                        and r.get('Id')[3:].isdigit()] + [0]) + 1
+        slide_target_dir = posixpath.relpath(self._slide_dir, posixpath.dirname('/' + self._presentation_name))
+        sld_id_lst = presentation.get_or_add_sldIdLst()
+        for number in range(1, self.slide_count + 1):
+            rid = f"rId{next_rid + number - 1}"
+            etree.SubElement(rels, qn('pr:Relationship'), Id=rid, Type=RT.SLIDE,
+                             Target=posixpath.join(slide_target_dir, f"slide{number}.xml"))
+            sld_id_lst._add_sldId(id=255 + number, rId=rid)
+            etree.SubElement(content_types, qn('ct:Override'),
+                             PartName=posixpath.join(self._slide_dir, f"slide{number}.xml"), ContentType=CT.PML_SLIDE)
+        for partname, content_type in self._overrides:
+            etree.SubElement(content_types, qn('ct:Override'), PartName=partname, ContentType=content_type)
+        known_extensions = {d.get('Extension', '').lower() for d in content_types.iter(qn('ct:Default'))}
+        for ext, content_type in self._media_types.items():
+            if ext not in known_extensions:
+                default = etree.Element(qn('ct:Default'), Extension=ext, ContentType=content_type)
+                content_types.insert(0, default)
+
+        self._zip.writestr(self._presentation_name, serialize_part_xml(presentation))
+        self._zip.writestr(self._presentation_rels_name, serialize_part_xml(rels))
+        self._zip.writestr('[Content_Types].xml', serialize_part_xml(content_types))
+        self._zip.close()
+
+    def abort(self):
+        self._zip.abort()
+        try:
+            os.remove(self.output_path)
+        except (OSError, TypeError):
+            pass
+
+
+class PdfExporter:
+    # ==========================================
+    # PDF 导出：调用本机 LibreOffice (soffice --headless) 转换，不经过网络
+    # 最多 pool_size 个转换进程同时运行，每个槽位有自己的用户配置目录
+    # (同一配置目录不能被两个 soffice 同时使用)，配置目录在整个导出期间复用；
+    # 单个文件超过 timeout 秒时结束整个进程树并记为失败
+    # ==========================================
+    WINDOWS_PATHS = (r"C:\Program Files\LibreOffice\program\soffice.exe",
+                     r"C:\Program Files (x86)\LibreOffice\program\soffice.exe")
+    MAC_PATH = "/Applications/LibreOffice.app/Contents/MacOS/soffice"
+
+    def __init__(self, pool_size=2, timeout=600, soffice_path=None, output_dir=None, log=None):
+        self.soffice_path = soffice_path or self.find_soffice()
+        if not self.soffice_path or not (os.path.isfile(self.soffice_path) or shutil.which(self.soffice_path)):
+            raise FileNotFoundError("未找到 LibreOffice (soffice)，请先安装，或通过 --soffice 指定路径")
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        # 默认与 pptx 放在同一目录
+        self.output_dir = output_dir
+        self.log = log or print
+        self._profile_root = tempfile.mkdtemp(prefix="ppt_pdf_")
+        self._profiles = queue.Queue()
+        for i in range(self.pool_size):
+            self._profiles.put(os.path.join(self._profile_root, f"profile{i + 1}"))
+        self._pool = ThreadPoolExecutor(max_workers=self.pool_size)
+        self._futures = []
+
+    @classmethod
+    def find_soffice(cls):
+        for name in ("soffice", "libreoffice"):
+            path = shutil.which(name)
+            if path:
+                return path
+        for path in cls.WINDOWS_PATHS + (cls.MAC_PATH,):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def submit(self, pptx_path):
+        future = self._pool.submit(self._convert, pptx_path)
+        self._futures.append((pptx_path, future))
+        return future
+
+    def _convert(self, pptx_path):
+        profile = self._profiles.get()
+        try:
+            pptx_path = os.path.abspath(pptx_path)
+            output_dir = self.output_dir or os.path.dirname(pptx_path)
+            pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(pptx_path))[0] + ".pdf")
+            if os.path.exists(pdf_path):
+                # 删除旧文件，避免转换失败时误把上一次的结果当作成功
+                os.remove(pdf_path)
+            command = [self.soffice_path, "-env:UserInstallation=" + pathlib.Path(profile).as_uri(),
+                       "--headless", "--invisible", "--nologo", "--norestore", "--nolockcheck",
+                       "--convert-to", "pdf", "--outdir", output_dir, pptx_path]
+            start = time.perf_counter()
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       **self._process_group_options())
+            try:
+                _, stderr = process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                self._kill_tree(process)
+                process.communicate()
+                raise TimeoutError(f"转换超时 (超过 {self.timeout}s)")
+            if process.returncode != 0 or not os.path.isfile(pdf_path):
+                raise RuntimeError(f"soffice 返回 {process.returncode}: {stderr.decode(errors='ignore').strip()}")
+            self.log(f"PDF 已导出: {pdf_path} ({time.perf_counter() - start:.1f}s)")
+            return pdf_path
+        finally:
+            self._profiles.put(profile)
+
+    @staticmethod
+    def _process_group_options():
+        # soffice 会再启动 soffice.bin，超时时需要结束整个进程组
+        if os.name == 'nt':
+            return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW}
+        return {"start_new_session": True}
+
+    @staticmethod
+    def _kill_tree(process):
+        try:
+            if os.name == 'nt':
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            process.kill()
+
+    def wait(self):
+        # 等待已提交的转换全部结束，返回 (PDF 路径列表, [(pptx 路径, 错误信息)])
+        pdf_files, failures = [], []
+        for pptx_path, future in self._futures:
+            try:
+                pdf_files.append(future.result())
+            except Exception as e:
+                failures.append((pptx_path, str(e)))
+        self._futures = []
+        return pdf_files, failures
+
+    def cancel(self):
+        # 撤回尚未开始的转换；已在运行的转换最多再持续 timeout 秒
+        for _, future in self._futures:
+            future.cancel()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        shutil.rmtree(self._profile_root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 class PPTToolGUI:
@@ -223,6 +2324,11 @@ class PPTToolGUI:
         self.mode_var = tk.IntVar(value=1)
         self.custom_n_var = tk.StringVar(value="")
 
+        # === 后台生成：工作线程只往队列里投递事件，界面由主线程定时刷新 ===
+        self.event_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.worker_thread = None
+
         self._create_widgets()
 
     # === 【新增】窗口居中辅助函数 ===
@@ -339,7 +2445,15 @@ class PPTToolGUI:
         self.btn_run = tk.Button(main_frame, textvariable=self.btn_run_text, command=self.run_generation,
                                  bg=self.accent_green, fg="white", font=("Microsoft YaHei UI", 14, "bold"),
                                  relief="flat", cursor="hand2", pady=10)
-        self.btn_run.pack(side='top', fill='x', pady=(10, 20))
+        self.btn_run.pack(side='top', fill='x', pady=(10, 5))
+
+        self.btn_cancel = ttk.Button(main_frame, text="取消生成 (Cancel)", command=self.cancel_generation,
+                                     style='Regular.TButton', cursor="hand2", state='disabled')
+        self.btn_cancel.pack(side='top', pady=(0, 10))
+
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(main_frame, variable=self.progress_var, maximum=100)
+        self.progress_bar.pack(side='top', fill='x', pady=(0, 15))
 
         self._animate_button()
 
@@ -609,19 +2723,37 @@ class PPTToolGUI:
         btn_close.pack(side='bottom', pady=(0, 25))
 
     def append_log(self, message):
-        self.log_text.config(state='normal')
+        self.append_logs([message])
+
+    def append_logs(self, messages):
+        # 多行日志一次插入，避免每行都触发重绘
         timestamp = datetime.now().strftime("[%H:%M:%S] ")
-        self.log_text.insert('end', timestamp + str(message) + "\n")
+        self.log_text.config(state='normal')
+        self.log_text.insert('end', "".join(timestamp + str(m) + "\n" for m in messages))
         self.log_text.see('end')
         self.log_text.config(state='disabled')
-        self.root.update()
+
+    def post_log(self, message):
+        # 供工作线程调用：tkinter 控件只能在主线程中操作
+        self.event_queue.put(("log", message))
+
+    def post_progress(self, event):
+        self.event_queue.put(("progress", event))
+
+    def show_progress(self, event):
+        if event["total_pages"]:
+            self.progress_bar.config(mode='determinate')
+            self.progress_var.set(100.0 * event["pages_done"] / event["total_pages"])
+        self.status_label.config(text=f"🔥 {format_progress(event)}", fg=self.accent_pink)
 
     def select_template(self):
         filename = filedialog.askopenfilename(title="选择PPT模板", filetypes=[("PowerPoint", "*.pptx *.ppt")])
         if filename: self.template_path.set(filename)
 
     def select_excel(self):
-        filename = filedialog.askopenfilename(title="选择Excel文件", filetypes=[("Excel", "*.xlsx *.xls *.csv")])
+        filename = filedialog.askopenfilename(title="选择数据文件", filetypes=[
+            ("数据文件", "*.xlsx *.xls *.csv *.parquet *.jsonl"), ("Excel", "*.xlsx *.xls"), ("CSV", "*.csv"),
+            ("Parquet", "*.parquet"), ("JSON Lines", "*.jsonl")])
         if filename: self.excel_path.set(filename)
 
     def select_output(self):
@@ -674,38 +2806,285 @@ class PPTToolGUI:
 
         self.status_label.config(text=f"🔥 正在施法 (N={records_per_page})... (Processing)", fg=self.accent_pink)
         self.btn_run.config(state='disabled', bg="#ccc")
+        self.btn_cancel.config(state='normal')
 
         self.log_text.config(state='normal')
         self.log_text.delete(1.0, 'end')
         self.log_text.config(state='disabled')
-        self.root.update()
+        self.progress_var.set(0)
 
+        self.cancel_event.clear()
+        self.worker_thread = threading.Thread(target=self._generation_worker,
+                                              args=(t_path, e_path, o_path, records_per_page), daemon=True)
+        self.worker_thread.start()
+        self.root.after(100, self._pump_events)
+
+    def _generation_worker(self, t_path, e_path, o_path, records_per_page):
+        # 在后台线程中运行，结果通过事件队列交回主线程
         try:
-            generator = PPTGenerator(t_path, e_path, o_path, log_callback=self.append_log)
+            generator = PPTGenerator(t_path, e_path, o_path, log_callback=self.post_log,
+                                     cancel_event=self.cancel_event, progress_callback=self.post_progress)
 
             # 直接调用通用的生成函数
             generator.run_general_mode(records_per_page)
+            self.event_queue.put(("done", (records_per_page, o_path)))
+        except GenerationCancelled:
+            self.event_queue.put(("cancelled", None))
+        except Exception as e:
+            self.event_queue.put(("log", f"运行出错: {str(e)}"))
+            self.event_queue.put(("error", traceback.format_exc()))
+
+    def _pump_events(self):
+        # 每 100ms 把队列中积压的事件一次性处理掉
+        logs = []
+        progress = None
+        finished = None
+        while True:
+            try:
+                kind, payload = self.event_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "log":
+                logs.append(payload)
+            elif kind == "progress":
+                # 只显示最新的进度
+                progress = payload
+            else:
+                finished = (kind, payload)
+        if logs:
+            self.append_logs(logs)
+        if progress is not None:
+            self.show_progress(progress)
+            if progress["finished"]:
+                self.append_log(format_progress(progress))
+
+        if finished is None:
+            self.root.after(100, self._pump_events)
+            return
 
+        self.btn_run.config(state='normal')
+        self.btn_cancel.config(state='disabled')
+        kind, payload = finished
+        if kind == "done":
+            records_per_page, o_path = payload
             self.status_label.config(text="✨ 生成完成 (Success)", fg=self.accent_green)
             self.append_log(">>> ✨ 所有任务执行完毕 ✨ <<<")
             messagebox.showinfo("🎉 成功", f"PPT 生成成功！\n模式: {records_per_page}个/页\n路径: {o_path}")
-
-        except Exception as e:
+        elif kind == "cancelled":
+            self.status_label.config(text="⏹ 已取消 (Cancelled)", fg="#888")
+            self.append_log(">>> 已取消生成，未完成的输出文件已删除")
+        else:
             self.status_label.config(text="💔 发生错误 (Error)", fg="red")
-            error_trace = traceback.format_exc()
-            self.append_log(f"运行出错: {str(e)}")
-            self.append_log(error_trace)
-            self.report_error(error_trace)
-
-        finally:
-            self.btn_run.config(state='normal')
-
-
-def main():
+            self.append_log(payload)
+            self.report_error(payload)
+
+    def cancel_generation(self):
+        if self.worker_thread is not None and self.worker_thread.is_alive():
+            self.cancel_event.set()
+            self.btn_cancel.config(state='disabled')
+            self.status_label.config(text="⏳ 正在取消... (Cancelling)", fg="#888")
+
+
+# ==========================================
+# 命令行模式 (无图形界面)
+# ==========================================
+JOB_KEYS = ("name", "template", "data", "output", "records_per_page", "streaming", "stream_data",
+            "max_slides_per_file", "max_bytes_per_file", "index", "stats", "cache", "keep_template",
+            "per_record", "pdf", "pdf_workers", "pdf_timeout", "soffice", "compression", "compress_threads")
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="根据 PPT 模板占位符和数据表批量生成证书 (不带参数运行时打开图形界面)")
+    parser.add_argument("-t", "--template", help="PPT 模板路径")
+    parser.add_argument("-d", "--data", help="数据文件路径 (xlsx/xls/csv/parquet/jsonl)")
+    parser.add_argument("-o", "--output", help="输出 pptx 路径")
+    parser.add_argument("-n", "--records-per-page", type=int, default=1, help="每页证书数量 (默认 1)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="渲染进程数 (默认 1，即串行)")
+    parser.add_argument("-m", "--manifest", help="批量任务清单 (JSON/YAML)，与 -t/-d/-o 二选一")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="清单中同时运行的任务数 (默认 4)")
+    parser.add_argument("--streaming", action="store_true", help="流式写出输出文件")
+    parser.add_argument("--stream-data", action="store_true",
+                        help="流式读取 xlsx 数据 (边读边生成)；列类型按已读到的行推断，"
+                             "若某列在前 2048 行之后才出现空值或其他类型，之前的行显示可能与非流式读取不同 (如 90 与 90.0)")
+    parser.add_argument("--max-slides", type=int, default=None, help="每个输出文件的最大页数")
+    parser.add_argument("--max-mb", type=float, default=None,
+                        help="每个输出文件的体积上限 (MB)，按已写页面估算，第一个分片可能略微超出")
+    parser.add_argument("--index", help="分片索引 CSV 路径")
+    parser.add_argument("--stats", help="各阶段耗时统计 JSON 输出路径")
+    parser.add_argument("--cache", help="增量生成缓存文件路径：重复运行时只重新渲染数据有变化的页面")
+    parser.add_argument("--blank-master", dest="keep_template", action="store_false",
+                        help="输出改用空白演示文稿的默认母版 (默认沿用模板的母版、版式和主题)")
+    parser.add_argument("--per-record", metavar="PATTERN",
+                        help="每条记录单独输出一个 pptx，文件名模板如 \"[姓名]_[学号].pptx\"；此时 -o 为输出 zip 路径")
+    parser.add_argument("--pdf", action="store_true", help="生成后用本机 LibreOffice 把输出文件 (或各分片) 转为 PDF")
+    parser.add_argument("--pdf-workers", type=int, default=2, help="同时运行的 PDF 转换进程数 (默认 2)")
+    parser.add_argument("--pdf-timeout", type=float, default=600, help="单个文件的 PDF 转换超时秒数 (默认 600)")
+    parser.add_argument("--soffice", help="soffice 可执行文件路径 (默认自动查找)")
+    parser.add_argument("--compression", type=int, choices=range(10), default=None, metavar="0-9",
+                        help="输出文件的压缩级别，0 为仅存储 (最快，体积大)，默认 6")
+    parser.add_argument("--compress-threads", type=int, default=1, help="保存时并行压缩部件的线程数 (默认 1)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="逐页输出日志")
+    return parser
+
+
+def load_manifest(path):
+    # 清单格式：{"defaults": {...}, "jobs": [{"template": ..., "data": ..., "output": ...}, ...]}
+    # 也可以直接是任务列表；相对路径以清单所在目录为基准
+    with open(path, 'r', encoding='utf-8') as f:
+        if os.path.splitext(path)[1].lower() in ('.yaml', '.yml'):
+            if importlib.util.find_spec('yaml') is None:
+                raise ImportError("读取 YAML 清单需要安装 PyYAML：pip install pyyaml")
+            import yaml
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = manifest.get("defaults", {})
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    jobs = []
+    for i, entry in enumerate(manifest.get("jobs", []), 1):
+        job = dict(defaults, **entry)
+        unknown = set(job) - set(JOB_KEYS)
+        if unknown:
+            raise ValueError(f"清单第 {i} 个任务含有未知字段: {sorted(unknown)}")
+        for key in ("template", "data", "output"):
+            if not job.get(key):
+                raise ValueError(f"清单第 {i} 个任务缺少字段: {key}")
+        for key in ("template", "data", "output", "index", "stats", "cache"):
+            if job.get(key):
+                job[key] = os.path.join(base_dir, job[key])
+        job.setdefault("name", os.path.splitext(os.path.basename(job["output"]))[0])
+        jobs.append(job)
+    return jobs
+
+
+def run_job(job, workers=1, executor=None, progress_callback=None, verbose=False, log_prefix=""):
+    # 运行单个任务，返回 (输出文件列表, 耗时秒数)
+    start = time.perf_counter()
+    generator = PPTGenerator(job["template"], job["data"], job["output"], stream_data=job.get("stream_data", False),
+                             progress_callback=progress_callback, verbose=verbose, log_prefix=log_prefix,
+                             file_name_pattern=job.get("per_record"))
+    if job.get("per_record"):
+        if job.get("pdf"):
+            raise ValueError("按记录出文件模式暂不支持导出 PDF")
+        output_files = generator.run_per_record_mode(workers, executor, keep_template=job.get("keep_template", True),
+                                                     stats_path=job.get("stats"), compression=job.get("compression"))
+        return output_files, time.perf_counter() - start
+    pdf_exporter = None
+    if job.get("pdf"):
+        pdf_exporter = PdfExporter(job.get("pdf_workers", 2), job.get("pdf_timeout", 600), job.get("soffice"),
+                                   log=generator.log)
+    max_bytes = job.get("max_bytes_per_file")
+    try:
+        output_files = generator.run_general_mode(job.get("records_per_page", 1),
+                                                  streaming=job.get("streaming", False), workers=workers,
+                                                  max_slides_per_file=job.get("max_slides_per_file"),
+                                                  max_bytes_per_file=int(max_bytes) if max_bytes else None,
+                                                  index_path=job.get("index"), executor=executor,
+                                                  stats_path=job.get("stats"), cache_path=job.get("cache"),
+                                                  keep_template=job.get("keep_template", True),
+                                                  pdf_exporter=pdf_exporter, compression=job.get("compression"),
+                                                  compress_threads=job.get("compress_threads", 1))
+    finally:
+        if pdf_exporter is not None:
+            pdf_exporter.close()
+    return output_files + generator.pdf_files, time.perf_counter() - start
+
+
+def run_manifest(jobs, workers=1, concurrency=None, verbose=False):
+    # 任务之间用线程并发 (读数据、写文件)，页面渲染共用一个进程池
+    concurrency = max(1, min(concurrency or 4, len(jobs)))
+    # 按任务序号记录结果，清单里重名的任务不会互相覆盖
+    results = [None] * len(jobs)
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as job_pool:
+            futures = {job_pool.submit(run_job, job, workers, executor, None, verbose, f"[{job['name']}] "): index
+                       for index, job in enumerate(jobs)}
+            for future, index in futures.items():
+                try:
+                    output_files, seconds = future.result()
+                    results[index] = (True, seconds, output_files)
+                except Exception as e:
+                    traceback.print_exc()
+                    results[index] = (False, None, str(e))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print(f"\n批量任务完成: {len(jobs)} 个任务，总耗时 {time.perf_counter() - started:.2f}s")
+    for job, (ok, seconds, detail) in zip(jobs, results):
+        if ok:
+            print(f"  [成功] {job['name']}: {seconds:.2f}s -> {', '.join(detail)}")
+        else:
+            print(f"  [失败] {job['name']}: {detail}")
+    return all(ok for ok, _, _ in results)
+
+
+def run_cli(argv):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.records_per_page < 1:
+        parser.error("每页数量和进程数必须大于 0")
+
+    if args.manifest:
+        jobs = load_manifest(args.manifest)
+        if not jobs:
+            parser.error("清单中没有任务")
+        return 0 if run_manifest(jobs, args.workers, args.jobs, args.verbose) else 1
+
+    if not all([args.template, args.data, args.output]):
+        parser.error("需要同时指定 --template、--data 和 --output，或使用 --manifest")
+    job = {
+        "template": args.template,
+        "data": args.data,
+        "output": args.output,
+        "records_per_page": args.records_per_page,
+        "streaming": args.streaming,
+        "stream_data": args.stream_data,
+        "max_slides_per_file": args.max_slides,
+        "max_bytes_per_file": args.max_mb * 1024 * 1024 if args.max_mb else None,
+        "index": args.index,
+        "stats": args.stats,
+        "cache": args.cache,
+        "keep_template": args.keep_template,
+        "per_record": args.per_record,
+        "pdf": args.pdf,
+        "pdf_workers": args.pdf_workers,
+        "pdf_timeout": args.pdf_timeout,
+        "soffice": args.soffice,
+        "compression": args.compression,
+        "compress_threads": args.compress_threads,
+    }
+    output_files, seconds = run_job(job, args.workers, progress_callback=ConsoleProgressBar(), verbose=args.verbose)
+    print(f"完成: 用时 {seconds:.2f}s，输出 {len(output_files)} 个文件")
+    return 0
+
+
+def main(argv=None):
+    global tk, filedialog, messagebox, ttk
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_cli(argv)
+
+    try:
+        import tkinter as tk
+        from tkinter import filedialog, messagebox
+        from tkinter import ttk
+    except ImportError:
+        raise SystemExit("当前环境没有 tkinter，请通过命令行参数运行 (--help 查看用法)")
     root = tk.Tk()
     app = PPTToolGUI(root)
     root.mainloop()
+    return 0
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # 打包为 exe 后，多进程并行需要此调用
+    multiprocessing.freeze_support()
+    sys.exit(main())
\ No newline at end of file